@@ -0,0 +1,39 @@
+import pandas as pd
+
+# Columnar aggregation of run statistics. All runs are loaded into one frame (one row per run, see
+# log_ingest.RUN_COLUMNS) and every breakdown is a single groupby over it, for any combination of run
+# arguments (compiler, compiler flag, complexity, timeout, ...) and any set of statistics.
+
+VALUE_COLUMNS = ["best_heuristic", "best_code_size", "best_binary_size"]
+
+# Name of the result column -> (value column, pandas aggregation)
+RUN_STATISTICS = {
+    "count": ("best_heuristic", "size"),
+    "source_avg": ("best_code_size", "mean"),
+    "binary_avg": ("best_binary_size", "mean"),
+    "heuristic_avg": ("best_heuristic", "mean"),
+    "source_min": ("best_code_size", "min"),
+    "binary_max": ("best_binary_size", "max"),
+    "heuristic_max": ("best_heuristic", "max"),
+}
+
+
+def runs_frame(run_columns) -> pd.DataFrame:
+    runs = pd.DataFrame(run_columns)
+    for name in VALUE_COLUMNS:
+        runs[name] = runs[name].astype(float)
+    return runs
+
+
+# Statistics of the runs grouped by one or more columns. With `order`, the groups are returned in that
+# order (tuples for several columns) and groups without runs are kept as rows with a count of 0.
+def aggregate(runs, by, statistics=RUN_STATISTICS, order=None) -> pd.DataFrame:
+    grouped = runs.groupby(by, sort=order is None).agg(**statistics)
+    if order is not None:
+        if isinstance(by, (list, tuple)) and len(by) > 1:
+            grouped = grouped.reindex(pd.MultiIndex.from_tuples(order, names=by))
+        else:
+            grouped = grouped.reindex(order)
+        if "count" in grouped:
+            grouped["count"] = grouped["count"].fillna(0).astype(int)
+    return grouped
@@ -1,43 +1,38 @@
-import re
+import matplotlib
+# Figures are rendered in worker processes without a display
+matplotlib.use("Agg")
 import seaborn as sns
 import pandas as pd
 import matplotlib.pyplot as plt
 import argparse
-from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
 import os
-import statistics
 import sys
+from log_ingest import HEURISTIC_COLUMNS, RUN_COLUMNS, SIZE_COLUMNS, load_log
+from aggregate import aggregate, runs_frame
 
 # Constants
-TEMP_FILE = "data.csv"
+# Bump whenever the look of the figures changes, so that the render manifest does not skip them
+FIGURE_STYLE_VERSION = 1
+RENDER_MANIFEST_FILE = "render_manifest.json"
 
-# Regex patterns
-start_of_iteration_pattern = re.compile(r"Starting framework with the following arguments: Namespace\(verbose=False, output='/Users/viktorgsteiger/Documents/ast-project/testing_output(\d+)', show=False, timeout=(\d+), timeout_creduce=(\d+), timeout_creduce_iteration=(\d+), max_iterations=50, random=True, example=None, csmith='csmith', csmith_include='/opt/homebrew/Cellar/csmith/2.3.0/include/csmith-2.3.0', csmith_max_expr_complexity=(\d+), csmith_max_block_depth=(\d+), csmith_stop_by_stmt=(\d+), csmith_seed=0, creduce='creduce', candidates=20, compiler='(clang|g\+\+-13)', compiler_flag='(O0|O1|O2|O3)', regenerate=False\)")
-iteration_pattern = re.compile(r"Iteration (\d+)")
-best_candidate_pattern = re.compile(r"Best candidate this iteration: (.+)")
-interesting_pattern = re.compile(r"Best candidate info: \((\d+), (\d+)\)")
-best_heuristic_value = re.compile(r"Best heuristic value this iteration: (\d+\.\d+)")
+# Frame of the plotted values: col1 is the x axis, col2 (and col3) the y axes
+def plot_frame(rows, y_axes=1):
+    return pd.DataFrame(rows, columns=["col1", "col2", "col3"][:y_axes + 1])
 
 # Generic method to plot using one y-axis and save result as png
-def plot_one_y_axis(csv_data_str, plot_path, x_label, y_label):
-    with open(TEMP_FILE, 'w') as results_file:
-        results_file.write("col1,col2\n")
-        results_file.write(csv_data_str)
-    tips = pd.read_csv(TEMP_FILE)
+def plot_one_y_axis(tips, plot_path, x_label, y_label):
     sns.set_theme(style="white", palette="deep")
     res_plt = sns.pointplot(data=tips, x="col1", y="col2")
     res_plt.set(xlabel=x_label, ylabel=y_label)
     plt.tight_layout()
     plt.savefig(plot_path)
     plt.clf()
-    os.remove(TEMP_FILE)
 
 # Same as above, but with 2 y-axes
-def plot_two_y_axes(csv_data_str, plot_path, x_label, y_label, y2_label):
-    with open(TEMP_FILE, 'w') as results_file:
-        results_file.write("col1,col2,col3\n")
-        results_file.write(csv_data_str)
-    tips = pd.read_csv(TEMP_FILE)
+def plot_two_y_axes(tips, plot_path, x_label, y_label, y2_label):
     sns.set_theme(style="white", palette="deep")
     res_plt = sns.pointplot(data=tips, x="col1", y="col2")
     res_plt.set(xlabel=x_label, ylabel=y_label)
@@ -47,297 +42,170 @@ def plot_two_y_axes(csv_data_str, plot_path, x_label, y_label, y2_label):
     plt.tight_layout()
     plt.savefig(plot_path)
     plt.clf()
-    os.remove(TEMP_FILE)
 
-# Wrapper class to represent a test run
+def render_figure(plot_function, tips, plot_path, labels):
+    plot_function(tips, plot_path, *labels)
+    return plot_path
+
+# Collects the figures of a report and renders them together on a process pool. A figure is skipped if
+# its plot function, labels and data are the same as when it was last rendered into the plot folder
+# (content hashes are kept in the render manifest there).
+class FigureSet:
+    def __init__(self, plot_folder):
+        self.plot_folder = plot_folder
+        self.figures = []
+
+    def add(self, plot_function, tips, plot_path, *labels):
+        self.figures.append((plot_function, tips, plot_path, labels))
+
+    @staticmethod
+    def content_hash(plot_function, tips, labels):
+        content = json.dumps([FIGURE_STYLE_VERSION, plot_function.__name__, labels, tips.to_csv(index=False)])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def render(self, jobs=None, force=False):
+        manifest_path = os.path.join(self.plot_folder, RENDER_MANIFEST_FILE)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r") as f:
+                    manifest = json.load(f)
+            except ValueError:
+                manifest = {}
+
+        pending = {}
+        for plot_function, tips, plot_path, labels in self.figures:
+            name = os.path.relpath(plot_path, self.plot_folder)
+            digest = self.content_hash(plot_function, tips, labels)
+            if not force and manifest.get(name) == digest and os.path.exists(plot_path):
+                continue
+            pending[name] = (digest, (plot_function, tips, plot_path, labels))
+        print(f"Rendering {len(pending)} of {len(self.figures)} figures, the others are unchanged")
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(render_figure, *figure): name for name, (_, figure) in pending.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"ERROR: Rendering {name} failed: {e}")
+                    manifest.pop(name, None)
+                    continue
+                manifest[name] = pending[name][0]
+
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+# Wrapper class to represent a test run, built from a row of the parsed log (see log_ingest.load_log)
 class TestRun:
-    def __init__(self, run_params_list):
-        self.id_no = run_params_list[0]
-        self.timeout = run_params_list[1]
-        self.timeout_creduce = run_params_list[2]
-        self.timeout_creduce_iteration = run_params_list[3]
-        self.csmith_max_expr_complexity = run_params_list[4]
-        self.csmith_max_block_depth = run_params_list[5]
-        self.csmith_stop_by_stmt = run_params_list[6]
-        self.compiler = run_params_list[7]
-        self.compiler_flag = run_params_list[8]
-        self.run_log = run_params_list[9]
-        self.best_heuristic = max([float(val) for val in best_heuristic_value.findall(self.run_log)])
-        self.best_code_size = min([float(val[0]) for val in interesting_pattern.findall(self.run_log)])  # TODO: Fix to use real best
-        self.best_binary_size = max([float(val[1]) for val in interesting_pattern.findall(self.run_log)])  # TODO: Fix to use real best
+    def __init__(self, run_values, sizes, heuristics):
+        self.id_no = run_values["id_no"]
+        self.timeout = run_values["timeout"]
+        self.timeout_creduce = run_values["timeout_creduce"]
+        self.timeout_creduce_iteration = run_values["timeout_creduce_iteration"]
+        self.csmith_max_expr_complexity = run_values["csmith_max_expr_complexity"]
+        self.csmith_max_block_depth = run_values["csmith_max_block_depth"]
+        self.csmith_stop_by_stmt = run_values["csmith_stop_by_stmt"]
+        self.compiler = run_values["compiler"]
+        self.compiler_flag = run_values["compiler_flag"]
+        self.best_heuristic = run_values["best_heuristic"]
+        self.best_code_size = run_values["best_code_size"]  # TODO: Fix to use real best
+        self.best_binary_size = run_values["best_binary_size"]  # TODO: Fix to use real best
+        # (iteration, source size, binary size) and (iteration, heuristic) of the best candidate per iteration
+        self.sizes = sizes
+        self.heuristics = heuristics
     
     # Plot the source and binary size of this specific run over the iterations
-    def plot_code_size_binary_size(self, plot_path):
-        # Variables to store information
-        iteration = None
-        best_candidate = None
-        source_size = None
-        binary_size = None
-        csv_data_string = ""
-
-        for line in self.run_log.splitlines():
-            #print(line)
-            # Check if this line has information on a new iteration
-            match_iteration = iteration_pattern.search(line)
-            if match_iteration:
-                # Save the iteration number
-                iteration = match_iteration.group(1)
-                # Reset the other variables
-                best_candidate = None
-                source_size = None
-                binary_size = None
-            
-            # Check if this line has information on the best candidate this iteration
-            match_best_candidate = best_candidate_pattern.search(line)
-            if match_best_candidate:
-                # Save the path to the best candidate
-                best_candidate = match_best_candidate.group(1)
-            
-            # Check if this line has interesting information on source and binary size
-            match_interesting = interesting_pattern.search(line)
-            if match_interesting:
-                # Save the source size and binary size
-                source_size = match_interesting.group(1)
-                binary_size = match_interesting.group(2)
-            
-            # Check if this iteration has ended
-            if best_candidate and source_size and binary_size:
-                # Transform the source size and binary size to kB
-                source_size = int(source_size) / 1000
-                binary_size = int(binary_size) / 1000
-                csv_data_string += f"{iteration},{source_size},{binary_size}\n"
-                # Reset the variables
-                best_candidate = None
-                source_size = None
-                binary_size = None
+    def plot_code_size_binary_size(self, figures, plot_path):
+        # Transform the source size and binary size to kB
+        rows = [(iteration, source_size / 1000, binary_size / 1000) for iteration, source_size, binary_size in self.sizes]
 
         # Plot using generic function
-        plot_two_y_axes(csv_data_string, plot_path, "Iterations", "Code Size [kB]", "Binary Size [kB]")
+        figures.add(plot_two_y_axes, plot_frame(rows, 2), plot_path, "Iterations", "Code Size [kB]", "Binary Size [kB]")
 
 
     # Plot the heuristic value of this specific run over the iterations
-    def plot_heuristic(self, plot_path):
-        # Variables to store information
-        iteration = None
-        best_candidate = None
-        heuristic_val = None
-        csv_data_string = ""
-
-        for line in self.run_log.splitlines():
-            #print(line)
-            # Check if this line has information on a new iteration
-            match_iteration = iteration_pattern.search(line)
-            if match_iteration:
-                # Save the iteration number
-                iteration = match_iteration.group(1)
-                # Reset the other variables
-                best_candidate = None
-                heuristic_val = None
-            
-            # Check if this line has information on the best candidate this iteration
-            match_best_candidate = best_candidate_pattern.search(line)
-            if match_best_candidate:
-                # Save the path to the best candidate
-                best_candidate = match_best_candidate.group(1)
-            
-            # Check if this line has interesting information on source and binary size
-            match_heuristic = best_heuristic_value.search(line)
-            if match_heuristic:
-                # Save the source size and binary size
-                heuristic_val = match_heuristic.group(1)
-            
-            # Check if this iteration has ended
-            if best_candidate and heuristic_val:
-                csv_data_string += f"{iteration},{heuristic_val}\n"
-                # Reset the variables
-                best_candidate = None
-                heuristic_val = None
-
+    def plot_heuristic(self, figures, plot_path):
         # Plot using generic function
-        plot_one_y_axis(csv_data_string, plot_path, "Iterations", "Heuristic Value")
+        figures.add(plot_one_y_axis, plot_frame(self.heuristics, 1), plot_path, "Iterations", "Heuristic Value")
+
+
+# Loads the runs of a log in a single pass (or from the cache of an earlier pass) as columns, see log_ingest.load_log.
+# Results databases (--results-db of srcReduce) are read directly instead
+def load_run_data(log_file, use_cache=True):
+    if log_file.endswith((".db", ".sqlite")):
+        from srcreduce.results import load_plot_columns
+        return load_plot_columns(log_file)
+    return load_log(log_file, use_cache=use_cache)
+
+# Creates the TestRun objects of the given rows of the parsed runs (default: all runs)
+def test_runs_from_data(data, rows=None):
+    runs = data["runs"]
+    if rows is None:
+        rows = range(len(runs["id_no"]))
+    sizes = {row: [] for row in rows}
+    for run, iteration, source_size, binary_size in zip(*(data["sizes"][name] for name in SIZE_COLUMNS)):
+        if run in sizes:
+            sizes[run].append((iteration, source_size, binary_size))
+    heuristics = {row: [] for row in rows}
+    for run, iteration, heuristic in zip(*(data["heuristics"][name] for name in HEURISTIC_COLUMNS)):
+        if run in heuristics:
+            heuristics[run].append((iteration, heuristic))
+    return [TestRun({name: runs[name][row] for name in RUN_COLUMNS}, sizes[row], heuristics[row]) for row in rows]
+
+def load_test_runs(log_file, use_cache=True):
+    return test_runs_from_data(load_run_data(log_file, use_cache=use_cache))
+
+# Breakdowns of the best run values: name, description, run column, (value, label) of the groups and x axis label
+BREAKDOWNS = [
+    ("complexity", "complexity", "csmith_max_expr_complexity", [("5", "Low"), ("10", "Medium"), ("15", "High")], "Complexity"),
+    ("timeout", "timeout", "timeout", [("150", "Low"), ("200", "High")], "Timeout"),
+    ("opt", "compiler optimization", "compiler_flag", [("O0", "O0"), ("O1", "O1"), ("O2", "O2"), ("O3", "O3")], "Optimization flag"),
+]
+
+# Statistics over all combinations of these run arguments are written to run_statistics.csv
+STATISTICS_GROUPING = ["compiler", "compiler_flag", "csmith_max_expr_complexity", "timeout"]
+
+def create_plots(log_file, plot_folder, use_cache=True, jobs=None, force=False):
+    data = load_run_data(log_file, use_cache=use_cache)
+    runs = runs_frame(data["runs"])
+    if len(runs) == 0:
+        print(f"ERROR: No finished runs found in {log_file}")
+        sys.exit(1)
+    figures = FigureSet(plot_folder)
 
-def create_plots(log_file, plot_folder):
-    # Read log file
-    srcreduce_log = open(log_file, "r").read()
+    # Plotting best example
+    best_run = test_runs_from_data(data, [int(runs["best_heuristic"].idxmax())])[0]
+    best_run.plot_code_size_binary_size(figures, os.path.join(plot_folder, "best_run_sizes.png"))
+    best_run.plot_heuristic(figures, os.path.join(plot_folder, "best_run_heuristic.png"))
 
-    # Creating TestRun objects
-    runs_metadata = start_of_iteration_pattern.split(srcreduce_log)[1:]
-    test_run_objects = []
-    for i in range(len(runs_metadata) // 10):
-        test_run_objects.append(TestRun(runs_metadata[i*10:((i+1)*10)]))
+    # Plotting the best values per group vs. size difference
+    for name, description, column, groups, x_label in BREAKDOWNS:
+        statistics = aggregate(runs, column, order=[value for value, _ in groups])
+        labels = [label for _, label in groups]
+        print(f"Plotting {description} vs size difference, here are the datapoint counts:")
+        for label, count in zip(labels, statistics["count"]):
+            print(label, count)
+        print()
 
-    # Plotting best example
-    best_run = max(test_run_objects, key=attrgetter('best_heuristic'))
-    best_run.plot_code_size_binary_size(os.path.join(plot_folder, "best_run_sizes.png"))
-    best_run.plot_heuristic(os.path.join(plot_folder, "best_run_heuristic.png"))
-
-    ###########################################
-    # Plotting complexity vs. size difference #
-    ###########################################
-
-    # Classify runs in three groups
-    low_complexity_runs = [run for run in test_run_objects if run.csmith_max_expr_complexity == '5']
-    medium_complexity_runs = [run for run in test_run_objects if run.csmith_max_expr_complexity == '10']
-    high_complexity_runs = [run for run in test_run_objects if run.csmith_max_expr_complexity == '15']
-    print("Plotting complexity vs size difference, here are the datapoint counts:")
-    print("Low", len(low_complexity_runs))
-    print("Medium", len(medium_complexity_runs))
-    print("High", len(high_complexity_runs))
-    print()
-
-    # Plot average complexity
-    low_complexity_source_avg = statistics.mean([float(run.best_code_size) for run in low_complexity_runs])
-    low_complexity_binary_avg = statistics.mean([float(run.best_binary_size) for run in low_complexity_runs])
-    low_complexity_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in low_complexity_runs])
-    medium_complexity_source_avg = statistics.mean([float(run.best_code_size) for run in medium_complexity_runs])
-    medium_complexity_binary_avg = statistics.mean([float(run.best_binary_size) for run in medium_complexity_runs])
-    medium_complexity_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in medium_complexity_runs])
-    high_complexity_source_avg = statistics.mean([float(run.best_code_size) for run in high_complexity_runs])
-    high_complexity_binary_avg = statistics.mean([float(run.best_binary_size) for run in high_complexity_runs])
-    high_complexity_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in high_complexity_runs])
-
-    csv_data_string = f"Low,{low_complexity_source_avg},{low_complexity_binary_avg}\n"
-    csv_data_string += f"Medium,{medium_complexity_source_avg},{medium_complexity_binary_avg}\n"
-    csv_data_string += f"High,{high_complexity_source_avg},{high_complexity_binary_avg}\n"
-    plot_two_y_axes(csv_data_string, os.path.join(plot_folder, "complexity_diff_sizes_avg.png"), "Complexity", "Average Code Size [kB]", "Average Binary Size [kB]")
-    
-    csv_data_string = f"Low,{low_complexity_heuristic_avg}\n"
-    csv_data_string += f"Medium,{medium_complexity_heuristic_avg}\n"
-    csv_data_string += f"High,{high_complexity_heuristic_avg}\n"
-    plot_one_y_axis(csv_data_string, os.path.join(plot_folder, "complexity_diff_heuristic_avg.png"), "Complexity", "Average Heuristic Value")
-
-    # Plot Max Complexity
-    low_complexity_source_min = min([float(run.best_code_size) for run in low_complexity_runs])
-    low_complexity_binary_max = max([float(run.best_binary_size) for run in low_complexity_runs])
-    low_complexity_heuristic_max = max([float(run.best_heuristic) for run in low_complexity_runs])
-    medium_complexity_source_min = min([float(run.best_code_size) for run in medium_complexity_runs])
-    medium_complexity_binary_max = max([float(run.best_binary_size) for run in medium_complexity_runs])
-    medium_complexity_heuristic_max = max([float(run.best_heuristic) for run in medium_complexity_runs])
-    high_complexity_source_min = min([float(run.best_code_size) for run in high_complexity_runs])
-    high_complexity_binary_max = max([float(run.best_binary_size) for run in high_complexity_runs])
-    high_complexity_heuristic_max = max([float(run.best_heuristic) for run in high_complexity_runs])
-
-    csv_data_string = f"Low,{low_complexity_source_min},{low_complexity_binary_max}\n"
-    csv_data_string += f"Medium,{medium_complexity_source_min},{medium_complexity_binary_max}\n"
-    csv_data_string += f"High,{high_complexity_source_min},{high_complexity_binary_max}\n"
-    plot_two_y_axes(csv_data_string, os.path.join(plot_folder, "complexity_diff_sizes_max.png"), "Complexity", "Minimum Code Size [kB]", "Maximum Binary Size [kB]")
-    
-    csv_data_string = f"Low,{low_complexity_heuristic_max}\n"
-    csv_data_string += f"Medium,{medium_complexity_heuristic_max}\n"
-    csv_data_string += f"High,{high_complexity_heuristic_max}\n"
-    plot_one_y_axis(csv_data_string, os.path.join(plot_folder, "complexity_diff_heuristic_max.png"), "Complexity", "Maximum Heuristic Value")
- 
-    ########################################
-    # Plotting timeout vs. size difference #
-    ########################################
-
-    # Classify runs in two groups
-    low_timeout_runs = [run for run in test_run_objects if run.timeout == '150']
-    high_timeout_runs = [run for run in test_run_objects if run.timeout == '200']
-    print("Plotting timeout vs size difference, here are the datapoint counts:")
-    print("Low", len(low_timeout_runs))
-    print("High", len(high_timeout_runs))
-    print()
-
-    # Plot average sizes
-    low_timeout_source_avg = statistics.mean([float(run.best_code_size) for run in low_timeout_runs])
-    low_timeout_binary_avg = statistics.mean([float(run.best_binary_size) for run in low_timeout_runs])
-    low_timeout_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in low_timeout_runs])
-    high_timeout_source_avg = statistics.mean([float(run.best_code_size) for run in high_timeout_runs])
-    high_timeout_binary_avg = statistics.mean([float(run.best_binary_size) for run in high_timeout_runs])
-    high_timeout_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in high_timeout_runs])
-
-    csv_data_string = f"Low,{low_timeout_source_avg},{low_timeout_binary_avg}\n"
-    csv_data_string += f"High,{high_timeout_source_avg},{high_timeout_binary_avg}\n"
-    plot_two_y_axes(csv_data_string, os.path.join(plot_folder, "timeout_diff_sizes_avg.png"), "Timeout", "Average Code Size [kB]", "Average Binary Size [kB]")
-    
-    csv_data_string = f"Low,{low_timeout_heuristic_avg}\n"
-    csv_data_string += f"High,{high_timeout_heuristic_avg}\n"
-    plot_one_y_axis(csv_data_string, os.path.join(plot_folder, "timeout_diff_heuristic_avg.png"), "Timeout", "Average Heuristic Value")
-
-    # Plot max sizes
-    low_timeout_source_min = min([float(run.best_code_size) for run in low_timeout_runs])
-    low_timeout_binary_max = max([float(run.best_binary_size) for run in low_timeout_runs])
-    low_timeout_heuristic_max = max([float(run.best_heuristic) for run in low_timeout_runs])
-    high_timeout_source_min = min([float(run.best_code_size) for run in high_timeout_runs])
-    high_timeout_binary_max = max([float(run.best_binary_size) for run in high_timeout_runs])
-    high_timeout_heuristic_max = max([float(run.best_heuristic) for run in high_timeout_runs])
-
-    csv_data_string = f"Low,{low_timeout_source_min},{low_timeout_binary_max}\n"
-    csv_data_string += f"High,{high_timeout_source_min},{high_timeout_binary_max}\n"
-    plot_two_y_axes(csv_data_string, os.path.join(plot_folder, "timeout_diff_sizes_max.png"), "Timeout", "Minimum Code Size [kB]", "Maximum Binary Size [kB]")
-    
-    csv_data_string = f"Low,{low_timeout_heuristic_max}\n"
-    csv_data_string += f"High,{high_timeout_heuristic_max}\n"
-    plot_one_y_axis(csv_data_string, os.path.join(plot_folder, "timeout_diff_heuristic_max.png"), "Timeout", "Maximum Heuristic Value")
-
-    #######################################################
-    # Plotting compiler optimizations vs. size difference #
-    #######################################################
-
-    # Classify runs in four groups
-    no_opt_runs = [run for run in test_run_objects if run.compiler_flag == 'O0']
-    low_opt_runs = [run for run in test_run_objects if run.compiler_flag == 'O1']
-    medium_opt_runs = [run for run in test_run_objects if run.compiler_flag == 'O2']
-    high_opt_runs = [run for run in test_run_objects if run.compiler_flag == 'O3']
-    print("Plotting compiler optimization vs size difference, here are the datapoint counts:")
-    print("O0", len(no_opt_runs))
-    print("O1", len(low_opt_runs))
-    print("O2", len(medium_opt_runs))
-    print("O3", len(high_opt_runs))
-    print()
-
-    # Plot average sizes
-    no_opt_source_avg = statistics.mean([float(run.best_code_size) for run in no_opt_runs])
-    no_opt_binary_avg = statistics.mean([float(run.best_binary_size) for run in no_opt_runs])
-    no_opt_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in no_opt_runs])
-    low_opt_source_avg = statistics.mean([float(run.best_code_size) for run in low_opt_runs])
-    low_opt_binary_avg = statistics.mean([float(run.best_binary_size) for run in low_opt_runs])
-    low_opt_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in low_opt_runs])
-    medium_opt_source_avg = statistics.mean([float(run.best_code_size) for run in medium_opt_runs])
-    medium_opt_binary_avg = statistics.mean([float(run.best_binary_size) for run in medium_opt_runs])
-    medium_opt_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in medium_opt_runs])
-    high_opt_source_avg = statistics.mean([float(run.best_code_size) for run in high_opt_runs])
-    high_opt_binary_avg = statistics.mean([float(run.best_binary_size) for run in high_opt_runs])
-    high_opt_heuristic_avg = statistics.mean([float(run.best_heuristic) for run in high_opt_runs])
-
-    csv_data_string = f"O0,{no_opt_source_avg},{no_opt_binary_avg}\n"
-    csv_data_string += f"O1,{low_opt_source_avg},{low_opt_binary_avg}\n"
-    csv_data_string += f"O2,{medium_opt_source_avg},{medium_opt_binary_avg}\n"
-    csv_data_string += f"O3,{high_opt_source_avg},{high_opt_binary_avg}\n"
-    plot_two_y_axes(csv_data_string, os.path.join(plot_folder, "opt_diff_sizes_avg.png"), "Optimization flag", "Average Code Size [kB]", "Average Binary Size [kB]")
-
-    csv_data_string = f"O0,{no_opt_heuristic_avg}\n"
-    csv_data_string += f"O1,{low_opt_heuristic_avg}\n"
-    csv_data_string += f"O2,{medium_opt_heuristic_avg}\n"
-    csv_data_string += f"O3,{high_opt_heuristic_avg}\n"
-    plot_one_y_axis(csv_data_string, os.path.join(plot_folder, "opt_diff_heuristic_avg.png"), "Optimizaton flag", "Average Heuristic Value")
-
-    # Plot max sizes
-    no_opt_source_min = min([float(run.best_code_size) for run in no_opt_runs])
-    no_opt_binary_max = max([float(run.best_binary_size) for run in no_opt_runs])
-    no_opt_heuristic_max = max([float(run.best_heuristic) for run in no_opt_runs])
-    low_opt_source_min = min([float(run.best_code_size) for run in low_opt_runs])
-    low_opt_binary_max = max([float(run.best_binary_size) for run in low_opt_runs])
-    low_opt_heuristic_max = max([float(run.best_heuristic) for run in low_opt_runs])
-    medium_opt_source_min = min([float(run.best_code_size) for run in medium_opt_runs])
-    medium_opt_binary_max = max([float(run.best_binary_size) for run in medium_opt_runs])
-    medium_opt_heuristic_max = max([float(run.best_heuristic) for run in medium_opt_runs])
-    high_opt_source_min = min([float(run.best_code_size) for run in high_opt_runs])
-    high_opt_binary_max = max([float(run.best_binary_size) for run in high_opt_runs])
-    high_opt_heuristic_max = max([float(run.best_heuristic) for run in high_opt_runs])
-
-    csv_data_string = f"O0,{no_opt_source_min},{no_opt_binary_max}\n"
-    csv_data_string += f"O1,{low_opt_source_min},{low_opt_binary_max}\n"
-    csv_data_string += f"O2,{medium_opt_source_min},{medium_opt_binary_max}\n"
-    csv_data_string += f"O3,{high_opt_source_min},{high_opt_binary_max}\n"
-    plot_two_y_axes(csv_data_string, os.path.join(plot_folder, "opt_diff_sizes_max.png"), "Optimization flag", "Minimum Code Size [kB]", "Maximum Binary Size [kB]")
-
-    csv_data_string = f"O0,{no_opt_heuristic_max}\n"
-    csv_data_string += f"O1,{low_opt_heuristic_max}\n"
-    csv_data_string += f"O2,{medium_opt_heuristic_max}\n"
-    csv_data_string += f"O3,{high_opt_heuristic_max}\n"
-    plot_one_y_axis(csv_data_string, os.path.join(plot_folder, "opt_diff_heuristic_max.png"), "Optimization flag", "Maximum Heuristic Value")
+        # Plot average sizes
+        rows = list(zip(labels, statistics["source_avg"], statistics["binary_avg"]))
+        figures.add(plot_two_y_axes, plot_frame(rows, 2), os.path.join(plot_folder, f"{name}_diff_sizes_avg.png"), x_label, "Average Code Size [kB]", "Average Binary Size [kB]")
+        rows = list(zip(labels, statistics["heuristic_avg"]))
+        figures.add(plot_one_y_axis, plot_frame(rows, 1), os.path.join(plot_folder, f"{name}_diff_heuristic_avg.png"), x_label, "Average Heuristic Value")
+
+        # Plot max sizes
+        rows = list(zip(labels, statistics["source_min"], statistics["binary_max"]))
+        figures.add(plot_two_y_axes, plot_frame(rows, 2), os.path.join(plot_folder, f"{name}_diff_sizes_max.png"), x_label, "Minimum Code Size [kB]", "Maximum Binary Size [kB]")
+        rows = list(zip(labels, statistics["heuristic_max"]))
+        figures.add(plot_one_y_axis, plot_frame(rows, 1), os.path.join(plot_folder, f"{name}_diff_heuristic_max.png"), x_label, "Maximum Heuristic Value")
+
+    aggregate(runs, STATISTICS_GROUPING).to_csv(os.path.join(plot_folder, "run_statistics.csv"))
+
+    figures.render(jobs=jobs, force=force)
 
 
 #######################################################################################
@@ -345,10 +213,13 @@ def create_plots(log_file, plot_folder):
 #######################################################################################
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser()
-    argparser.add_argument("input_file", help="Path to the (cleaned) log file or the CSV file")
+    argparser.add_argument("input_file", help="Path to the (cleaned) log file, the results database (.db/.sqlite) or the CSV file")
     argparser.add_argument("plot_folder", help="Path to the output plot folder")
     argparser.add_argument("--input-as-csv", action="store_true", default=False, help="Specifies whether input is a CSV or LOG file")
     argparser.add_argument("--csv-type", type=str, default=None, help="Specifies which type of data the csv contains (complexity, optimizations, timeout, single)")
+    argparser.add_argument("--jobs", type=int, default=None, help="Number of processes rendering figures (default: number of CPUs)")
+    argparser.add_argument("--force", action="store_true", default=False, help="Render all figures, also those whose data did not change")
+    argparser.add_argument("--no-cache", action="store_true", default=False, help="Parse the log again instead of using the cached result of an earlier run")
     args = argparser.parse_args()
     
     # Create plot output folder
@@ -357,7 +228,7 @@ if __name__ == "__main__":
     
     # Standard mode
     if not args.input_as_csv:
-        create_plots(args.log_file, args.plot_folder)
+        create_plots(args.input_file, args.plot_folder, use_cache=not args.no_cache, jobs=args.jobs, force=args.force)
     # Catch usage error and print friendly message
     elif args.csv_type not in ['complexity', 'optimizations', 'timeout', 'single']:
         print("ERROR: You specified to input a CSV, but did not specify a correct CSV type")
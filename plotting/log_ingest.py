@@ -0,0 +1,207 @@
+import os
+import re
+import gzip
+import numpy as np
+
+# Single pass ingestion of srcreduce logs (plain or gzip-compressed rotated logs). The per-run values
+# and series the plots need are collected while streaming the log line by line, so memory only grows
+# with the number of runs and iterations, not with the size of the log. The result is cached as
+# columns next to the log and reused as long as the log's modification time and size do not change.
+
+# Bump whenever the parsed columns change so old caches are parsed again
+CACHE_FORMAT_VERSION = 1
+
+# Run arguments used to classify runs, kept as strings like in the log
+RUN_PARAMS = [
+    "timeout",
+    "timeout_creduce",
+    "timeout_creduce_iteration",
+    "csmith_max_expr_complexity",
+    "csmith_max_block_depth",
+    "csmith_stop_by_stmt",
+    "compiler",
+    "compiler_flag",
+]
+
+RUN_COLUMNS = ["id_no", *RUN_PARAMS, "best_heuristic", "best_code_size", "best_binary_size"]
+SIZE_COLUMNS = ["run", "iteration", "source_size", "binary_size"]
+HEURISTIC_COLUMNS = ["run", "iteration", "heuristic"]
+
+# Regex patterns
+start_of_run_marker = "Starting framework with the following arguments: Namespace("
+namespace_item_pattern = re.compile(r"(\w+)=('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|[^,()\s]+)")
+output_id_pattern = re.compile(r"(\d+)$")
+iteration_pattern = re.compile(r"Iteration (\d+)")
+best_candidate_pattern = re.compile(r"Best candidate this iteration: (.+)")
+interesting_pattern = re.compile(r"Best candidate info: \((\d+), (\d+)\)")
+best_heuristic_value = re.compile(r"Best heuristic value this iteration: (\d+\.\d+)")
+
+
+def open_log(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    return open(path, "r", errors="replace")
+
+
+# Arguments of a run from the repr of its argparse Namespace, independent of which arguments exist
+def parse_run_arguments(line) -> dict:
+    namespace = line[line.index(start_of_run_marker) + len(start_of_run_marker):]
+    arguments = {}
+    for name, value in namespace_item_pattern.findall(namespace):
+        if value[:1] in "'\"":
+            value = value[1:-1]
+        arguments[name] = value
+    return arguments
+
+
+class _RunState:
+    def __init__(self, arguments):
+        match = output_id_pattern.search(arguments.get("output", ""))
+        self.values = {"id_no": match.group(1) if match else ""}
+        for name in RUN_PARAMS:
+            self.values[name] = arguments.get(name, "")
+        self.iteration = None
+        # The size and the heuristic series each complete a point once the best candidate of the
+        # iteration and their value have been seen
+        self.size_candidate = None
+        self.source_size = None
+        self.binary_size = None
+        self.heuristic_candidate = None
+        self.heuristic_val = None
+        self.best_heuristic = None
+        self.best_code_size = None
+        self.best_binary_size = None
+        self.sizes = []
+        self.heuristics = []
+
+    def feed(self, line) -> None:
+        match_iteration = iteration_pattern.search(line)
+        if match_iteration:
+            self.iteration = int(match_iteration.group(1))
+            self.size_candidate = self.source_size = self.binary_size = None
+            self.heuristic_candidate = self.heuristic_val = None
+
+        match_best_candidate = best_candidate_pattern.search(line)
+        if match_best_candidate:
+            self.size_candidate = self.heuristic_candidate = match_best_candidate.group(1)
+
+        match_interesting = interesting_pattern.search(line)
+        if match_interesting:
+            self.source_size = int(match_interesting.group(1))
+            self.binary_size = int(match_interesting.group(2))
+            # TODO: Fix to use real best
+            self.best_code_size = self.source_size if self.best_code_size is None else min(self.best_code_size, self.source_size)
+            self.best_binary_size = self.binary_size if self.best_binary_size is None else max(self.best_binary_size, self.binary_size)
+
+        match_heuristic = best_heuristic_value.search(line)
+        if match_heuristic:
+            self.heuristic_val = float(match_heuristic.group(1))
+            self.best_heuristic = self.heuristic_val if self.best_heuristic is None else max(self.best_heuristic, self.heuristic_val)
+
+        if self.size_candidate and self.source_size is not None and self.binary_size is not None:
+            self.sizes.append((self.iteration, self.source_size, self.binary_size))
+            self.size_candidate = self.source_size = self.binary_size = None
+        if self.heuristic_candidate and self.heuristic_val is not None:
+            self.heuristics.append((self.iteration, self.heuristic_val))
+            self.heuristic_candidate = self.heuristic_val = None
+
+    # Runs without any scored candidate (e.g. crashed right away) cannot be plotted and are skipped
+    def complete(self) -> bool:
+        return self.best_heuristic is not None and self.best_code_size is not None
+
+
+def _empty_columns():
+    return (
+        {name: [] for name in RUN_COLUMNS},
+        {name: [] for name in SIZE_COLUMNS},
+        {name: [] for name in HEURISTIC_COLUMNS},
+    )
+
+
+def parse_log(path):
+    runs, sizes, heuristics = _empty_columns()
+
+    def finish(run):
+        if run is None or not run.complete():
+            return
+        index = len(runs["id_no"])
+        for name, value in run.values.items():
+            runs[name].append(value)
+        runs["best_heuristic"].append(run.best_heuristic)
+        runs["best_code_size"].append(run.best_code_size)
+        runs["best_binary_size"].append(run.best_binary_size)
+        for iteration, source_size, binary_size in run.sizes:
+            sizes["run"].append(index)
+            sizes["iteration"].append(iteration)
+            sizes["source_size"].append(source_size)
+            sizes["binary_size"].append(binary_size)
+        for iteration, heuristic in run.heuristics:
+            heuristics["run"].append(index)
+            heuristics["iteration"].append(iteration)
+            heuristics["heuristic"].append(heuristic)
+
+    run = None
+    with open_log(path) as f:
+        for line in f:
+            if start_of_run_marker in line:
+                finish(run)
+                run = _RunState(parse_run_arguments(line))
+            elif run is not None:
+                run.feed(line)
+    finish(run)
+    return {"runs": runs, "sizes": sizes, "heuristics": heuristics}
+
+
+def cache_path(path) -> str:
+    return path + ".columns.npz"
+
+
+def _save_cache(path, stat, data) -> None:
+    arrays = {
+        "version": np.array(CACHE_FORMAT_VERSION),
+        "mtime_ns": np.array(stat.st_mtime_ns),
+        "size": np.array(stat.st_size),
+    }
+    for table, columns in data.items():
+        for name, values in columns.items():
+            arrays[f"{table}__{name}"] = np.array(values, dtype=str if name == "id_no" or name in RUN_PARAMS else None)
+    tmp_path = cache_path(path) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, cache_path(path))
+
+
+def _load_cache(path, stat):
+    try:
+        with np.load(cache_path(path)) as cached:
+            if (
+                int(cached["version"]) != CACHE_FORMAT_VERSION
+                or int(cached["mtime_ns"]) != stat.st_mtime_ns
+                or int(cached["size"]) != stat.st_size
+            ):
+                return None
+            runs, sizes, heuristics = _empty_columns()
+            data = {"runs": runs, "sizes": sizes, "heuristics": heuristics}
+            for table, columns in data.items():
+                for name in columns:
+                    columns[name] = cached[f"{table}__{name}"].tolist()
+            return data
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+# Returns the parsed log as columns: "runs" (one row per run), "sizes" and "heuristics" (one row per
+# iteration of a run, "run" is the row of the run)
+def load_log(path, use_cache=True) -> dict:
+    stat = os.stat(path)
+    if use_cache:
+        data = _load_cache(path, stat)
+        if data is not None:
+            return data
+    data = parse_log(path)
+    if use_cache:
+        try:
+            _save_cache(path, stat, data)
+        except OSError as e:
+            print(f"WARNING: Cannot write parsed log cache {cache_path(path)}: {e}")
+    return data
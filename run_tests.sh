@@ -7,37 +7,25 @@ source /Users/viktorgsteiger/.virtualenvs/ast-project/bin/activate
 # Install Python package
 pip install -e .
 
-# Set up parameters
-compilers=("clang" "g++-13")
-timeouts_creduce=(5 10 15)
-timeouts_creduce_iteration=(25 50 75)
-timeouts_overall=(150 200 250)
-compiler_flags=("O0" "O1" "O2" "O3")
-csmith_expr_compls=(5 10 15)
-csmith_max_depths=(2 5 8)
-csmith_stop_by=(50 100 150)
+# Set up parameters, every combination is one point of the sweep
+cat > sweep_grid.json <<GRID
+{
+  "compiler": ["clang", "g++-13"],
+  "timeout_creduce": [5, 10, 15],
+  "timeout_creduce_iteration": [25, 50, 75],
+  "timeout": [150, 200, 250],
+  "compiler_flag": ["O0", "O1", "O2", "O3"],
+  "csmith_max_expr_complexity": [5, 10, 15],
+  "csmith_max_block_depth": [2, 5, 8],
+  "csmith_stop_by_stmt": [50, 100, 150]
+}
+GRID
 
-iteration=0
+# Run all combinations, points finished by an earlier (interrupted) invocation are skipped. Every point uses
+# 2 cores for creduce, so the points run side by side on all cores of the machine (--cores).
+# Progress is recorded in testing_output_sweep_manifest.jsonl, every point logs to testing_output<i>/srcreduce.log
+# and records its results in testing_output_results.sqlite
+srcReduce sweep sweep_grid.json --csmith csmith --creduce creduce --compiler clang --random --output "/Users/viktorgsteiger/Documents/ast-project/testing_output" --csmith-include "$CPATH" --creduce-jobs 2 --results-db "/Users/viktorgsteiger/Documents/ast-project/testing_output_results.sqlite"
 
-# Loop through all combinations
-for compiler in "${compilers[@]}"; do
-  for timeout_creduce in "${timeouts_creduce[@]}"; do
-    for timeout_creduce_iteration in "${timeouts_creduce_iteration[@]}"; do
-      for timeout_overall in "${timeouts_overall[@]}"; do
-        for compiler_flag in "${compiler_flags[@]}"; do
-          for csmith_expr_compl in "${csmith_expr_compls[@]}"; do
-            for csmith_max_depth in "${csmith_max_depths[@]}"; do
-              for csmith_stop in "${csmith_stop_by[@]}"; do
-                let iteration+=1
-
-                # Call srcReduce with current parameter combination
-                srcReduce --csmith csmith --creduce creduce --compiler "$compiler" --random --output "/Users/viktorgsteiger/Documents/ast-project/testing_output$iteration" --csmith-include "$CPATH" --timeout-creduce "$timeout_creduce" --timeout-creduce-iteration "$timeout_creduce_iteration" --timeout "$timeout_overall" --compiler-flag "$compiler_flag" --csmith-max-expr-complexity "$csmith_expr_compl" --csmith-max-block-depth "$csmith_max_depth" --csmith-stop-by-stmt "$csmith_stop"
-
-              done
-            done
-          done
-        done
-      done
-    done
-  done
-done
+# Plot the results of all points
+python plotting/extract_and_plot.py "/Users/viktorgsteiger/Documents/ast-project/testing_output_results.sqlite" "/Users/viktorgsteiger/Documents/ast-project/testing_output_plots"
@@ -0,0 +1,92 @@
+import math
+import json
+
+# Arm of LineageBandit that starts a new lineage from a freshly generated program
+NEW_LINEAGE = "new"
+
+
+class LineageBandit:
+    # UCB1 allocation of iterations between the lineages of a run (all candidates derived from one init*.c)
+    # and starting a new lineage (--lineage-bandit). The reward of an iteration is how much it improved
+    # the global best heuristic, relative to that best and capped at 1, so a lineage is only worth
+    # continuing while it can beat the other lineages. The new lineage arm is rewarded with what the
+    # first iteration of every new lineage achieved.
+    def __init__(self, exploration=math.sqrt(2)):
+        self.exploration = exploration
+        # lineage -> statistics, see add_lineage
+        self.lineages = {}
+        self.new_lineage_arm = {"pulls": 0, "reward": 0.0}
+        self.pulls = 0
+
+    def add_lineage(self, lineage, init_path, seed, init_heuristic=None) -> None:
+        self.lineages[lineage] = {
+            "lineage": lineage,
+            "init": init_path,
+            "seed": seed,
+            "pulls": 0,
+            "reward": 0.0,
+            "candidates": 0,
+            "init_heuristic": init_heuristic,
+            "best_heuristic": None,
+            "improvements": 0,
+        }
+
+    def _score(self, arm) -> float:
+        if arm["pulls"] == 0:
+            return math.inf
+        mean = arm["reward"] / arm["pulls"]
+        return mean + self.exploration * math.sqrt(math.log(max(1, self.pulls)) / arm["pulls"])
+
+    # Picks one of the `available` lineages (those with candidates left) or NEW_LINEAGE if allow_new,
+    # None if there is nothing to pick. Ties go to the lineage that was started first.
+    def choose(self, available, allow_new):
+        arms = [(lineage, self.lineages[lineage]) for lineage in available]
+        if allow_new:
+            arms.append((NEW_LINEAGE, self.new_lineage_arm))
+        if not arms:
+            return None
+        return max(arms, key=lambda arm: self._score(arm[1]))[0]
+
+    # Records an iteration of `lineage` whose best candidate had `best_heuristic` (None if it had none).
+    # Returns the reward.
+    def record(self, lineage, best_heuristic, global_best_before, candidates, new_lineage=False) -> float:
+        reward = 0.0
+        if best_heuristic is not None and best_heuristic > 0:
+            if global_best_before is None or global_best_before <= 0:
+                reward = 1.0
+            elif best_heuristic > global_best_before:
+                reward = min(1.0, (best_heuristic - global_best_before) / global_best_before)
+        stats = self.lineages[lineage]
+        stats["pulls"] += 1
+        stats["reward"] += reward
+        stats["candidates"] += candidates
+        if best_heuristic is not None and (stats["best_heuristic"] is None or best_heuristic > stats["best_heuristic"]):
+            stats["best_heuristic"] = best_heuristic
+            stats["improvements"] += 1
+        if new_lineage:
+            self.new_lineage_arm["pulls"] += 1
+            self.new_lineage_arm["reward"] += reward
+        self.pulls += 1
+        return reward
+
+    # JSON serializable state for checkpoints
+    def state(self) -> dict:
+        return {
+            "exploration": self.exploration,
+            "lineages": list(self.lineages.values()),
+            "new_lineage_arm": self.new_lineage_arm,
+            "pulls": self.pulls,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        bandit = cls(exploration=state["exploration"])
+        bandit.lineages = {stats["lineage"]: stats for stats in state["lineages"]}
+        bandit.new_lineage_arm = state["new_lineage_arm"]
+        bandit.pulls = state["pulls"]
+        return bandit
+
+    # Per lineage statistics for later analysis
+    def save(self, path) -> None:
+        with open(path, "w") as f:
+            json.dump({"new_lineage_arm": self.new_lineage_arm, "lineages": list(self.lineages.values())}, f, indent=2)
@@ -0,0 +1,198 @@
+import csv
+import math
+import logging
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from srcreduce.stats import PercentileList
+
+
+# Repetitions per category of a batch measurement mode
+BATCH_REPETITIONS = 10
+
+# Upper bound for the number of runs of one batch or sweep, every run gets its own shard of the csmith seed range
+MAX_BATCH_RUNS = 65536
+
+# Batch measurement modes: category -> arguments overridden for the runs of that category
+BATCH_MODES = {
+    "complexity": {
+        "Low": {"csmith_max_expr_complexity": 5, "csmith_max_block_depth": 2, "csmith_stop_by_stmt": 50},
+        "Medium": {"csmith_max_expr_complexity": 10, "csmith_max_block_depth": 5, "csmith_stop_by_stmt": 100},
+        "High": {"csmith_max_expr_complexity": 15, "csmith_max_block_depth": 8, "csmith_stop_by_stmt": 150},
+    },
+    "optimizations": {
+        "O0": {"compiler_flag": "O0"},
+        "O1": {"compiler_flag": "O1"},
+        "O2": {"compiler_flag": "O2"},
+        "O3": {"compiler_flag": "O3"},
+    },
+    "timeout": {
+        "5": {"timeout_creduce": 5, "timeout_creduce_iteration": 25},
+        "10": {"timeout_creduce": 10, "timeout_creduce_iteration": 50},
+        "15": {"timeout_creduce": 15, "timeout_creduce_iteration": 75},
+        "20": {"timeout_creduce": 20, "timeout_creduce_iteration": 100},
+        "25": {"timeout_creduce": 25, "timeout_creduce_iteration": 125},
+    },
+    # Records the best sizes of every iteration instead of only the final result
+    "single": {"": {}},
+}
+
+# One independent run of a batch. The run writes to <output><index> and returns its CSV rows instead of
+# writing them itself, so that only the scheduler touches the batch CSV.
+RunSpec = namedtuple("RunSpec", ["index", "category", "overrides", "save_iters"])
+
+
+def expand_batch_mode(mode, repetitions=BATCH_REPETITIONS) -> list:
+    specs = []
+    for category, overrides in BATCH_MODES[mode].items():
+        for _ in range(repetitions):
+            specs.append(RunSpec(len(specs) + 1, category, overrides, mode == "single"))
+    return specs
+
+
+def write_batch_csv_header(csv_path) -> None:
+    with open(csv_path, "w") as f:
+        f.write("type,size,category\n")
+
+
+def append_batch_csv_rows(csv_path, rows) -> None:
+    with open(csv_path, "a+", newline="") as f:
+        csv.writer(f, lineterminator="\n").writerows(rows)
+
+
+# Executes the specs with `execute(args, spec)` on `jobs` processes (in this process if jobs is 1).
+# execute returns (source size, binary size, csv rows) or None if the run failed. Results are
+# appended to the batch CSV as runs complete and passed on to on_result(spec, result).
+def run_batch(args, specs, execute, jobs=1, on_result=None) -> None:
+    def handle(spec, result):
+        if result is None:
+            logging.error("Batch run %d (%s) failed", spec.index, spec.category)
+            return
+        append_batch_csv_rows(args.batch_output_csv, result[2])
+        if on_result is not None:
+            on_result(spec, result)
+
+    if jobs == 1:
+        for spec in specs:
+            handle(spec, execute(args, spec))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(execute, args, spec): spec for spec in specs}
+        for future in as_completed(futures):
+            handle(futures[future], future.result())
+
+
+class AdaptiveRepetitions:
+    # Decides which category of a batch to run next. Every category gets min_repetitions runs, after that
+    # runs go to the category whose mean source or binary size is known least precisely (widest relative
+    # confidence interval, discounted by runs still in flight) until every category's interval is within
+    # `tolerance` of its mean or the budget of runs is spent.
+    def __init__(self, categories, budget, min_repetitions=3, tolerance=0.05):
+        assert min_repetitions >= 2
+        self.categories = list(categories)
+        self.budget = budget
+        self.min_repetitions = min_repetitions
+        self.tolerance = tolerance
+        self.src_sizes = {category: PercentileList() for category in self.categories}
+        self.bin_sizes = {category: PercentileList() for category in self.categories}
+        self.in_flight = {category: 0 for category in self.categories}
+        self.started = 0
+
+    def converged(self, category) -> bool:
+        return (
+            len(self.src_sizes[category]) >= self.min_repetitions
+            and self.src_sizes[category].check_confidence_interval(self.tolerance)
+            and self.bin_sizes[category].check_confidence_interval(self.tolerance)
+        )
+
+    def _uncertainty(self, category) -> float:
+        done = len(self.src_sizes[category])
+        # Without two finished runs there is no interval to compare
+        if done < 2:
+            return math.inf
+        width = max(self.src_sizes[category].get_relative_confidence_interval(), self.bin_sizes[category].get_relative_confidence_interval())
+        # The interval shrinks with the square root of the number of runs, assume the runs in flight help as well
+        return width * math.sqrt(done / (done + self.in_flight[category]))
+
+    # Returns the category of the next run or None if no further run is needed (or affordable) right now,
+    # or if it has to wait for the results of the runs in flight
+    def next_category(self):
+        if self.started >= self.budget:
+            return None
+        open_categories = [category for category in self.categories if not self.converged(category)]
+        if not open_categories:
+            return None
+        under_sampled = [c for c in open_categories if len(self.src_sizes[c]) + self.in_flight[c] < self.min_repetitions]
+        if under_sampled:
+            category = min(under_sampled, key=lambda c: len(self.src_sizes[c]) + self.in_flight[c])
+        elif any(len(self.src_sizes[c]) < 2 for c in open_categories):
+            # Extra runs are only assigned once every open category has an interval, until then wait for the
+            # runs in flight (a category with fewer results and no runs in flight is still under sampled)
+            return None
+        else:
+            # Categories whose minimum runs are still in flight may converge with them and get no extra runs yet
+            sampled = [c for c in open_categories if len(self.src_sizes[c]) >= self.min_repetitions]
+            if not sampled:
+                return None
+            category = max(sampled, key=self._uncertainty)
+            # Counting the runs in flight, even the least precise category is expected to be within the tolerance
+            if self._uncertainty(category) <= self.tolerance:
+                return None
+        self.in_flight[category] += 1
+        self.started += 1
+        return category
+
+    def add_result(self, category, result) -> None:
+        self.in_flight[category] -= 1
+        if result is not None:
+            self.src_sizes[category].add_item(result[0])
+            self.bin_sizes[category].add_item(result[1])
+
+
+# Like run_batch, but the runs of `mode` are chosen one at a time by AdaptiveRepetitions instead of a fixed
+# number of repetitions per category. The budget is the number of runs the fixed scheme would use.
+def run_adaptive_batch(args, mode, execute, jobs=1, min_repetitions=3, tolerance=0.05, on_result=None) -> AdaptiveRepetitions:
+    categories = BATCH_MODES[mode]
+    allocator = AdaptiveRepetitions(categories, BATCH_REPETITIONS * len(categories), min_repetitions, tolerance)
+
+    def next_spec():
+        category = allocator.next_category()
+        if category is None:
+            return None
+        return RunSpec(allocator.started, category, categories[category], mode == "single")
+
+    def handle(spec, result):
+        allocator.add_result(spec.category, result)
+        if result is None:
+            logging.error("Batch run %d (%s) failed", spec.index, spec.category)
+            return
+        append_batch_csv_rows(args.batch_output_csv, result[2])
+        if on_result is not None:
+            on_result(spec, result)
+        if allocator.converged(spec.category):
+            logging.info("Category %s converged after %d runs", spec.category, len(allocator.src_sizes[spec.category]))
+
+    if jobs == 1:
+        spec = next_spec()
+        while spec is not None:
+            handle(spec, execute(args, spec))
+            spec = next_spec()
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {}
+            while True:
+                while len(futures) < jobs:
+                    spec = next_spec()
+                    if spec is None:
+                        break
+                    futures[pool.submit(execute, args, spec)] = spec
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    handle(futures.pop(future), future.result())
+
+    for category in categories:
+        if not allocator.converged(category):
+            logging.warning("Category %s did not converge within the budget (%d runs)", category, len(allocator.src_sizes[category]))
+    return allocator
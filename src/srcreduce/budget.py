@@ -0,0 +1,115 @@
+import os
+import time
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+
+
+class CreduceBudget:
+    # Time budget of the creduce invocations of a run, driven by their yield (interesting candidates found
+    # per second). An invocation normally gets `base` seconds:
+    # - it is cut after `minimum` seconds if nothing was found for a while and its yield so far is well below
+    #   the yield of recent invocations,
+    # - it runs past `base` (up to `maximum`) as long as it keeps finding candidates.
+    def __init__(self, base, minimum=None, maximum=None, window=8, cutoff_ratio=0.25):
+        self.base = base
+        self.minimum = minimum if minimum is not None else max(1, base / 4)
+        self.maximum = maximum if maximum is not None else base * 4
+        assert 0 < self.minimum <= self.base <= self.maximum
+        # A parent counts as productive while its last find is at most this long ago
+        self.patience = self.minimum
+        self.cutoff_ratio = cutoff_ratio
+        self.recent_yields = deque(maxlen=window)
+        self.lock = threading.Lock()
+        # Set when the run is interrupted, running invocations are stopped right away
+        self.stopped = threading.Event()
+
+    # Called from the main thread, the invocations run in worker threads
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def expected_yield(self):
+        with self.lock:
+            if not self.recent_yields:
+                return None
+            return sum(self.recent_yields) / len(self.recent_yields)
+
+    # Whether an invocation that found `found` candidates in `elapsed` seconds, the last one `since_last_found`
+    # seconds ago (or since the start), should keep running
+    def keep_running(self, elapsed, found, since_last_found) -> bool:
+        if self.stopped.is_set() or elapsed >= self.maximum:
+            return False
+        productive = since_last_found < self.patience
+        if elapsed >= self.base:
+            return productive
+        if elapsed >= self.minimum and not productive:
+            expected = self.expected_yield()
+            if expected is not None and found / elapsed < self.cutoff_ratio * expected:
+                return False
+        return True
+
+    def record(self, found, elapsed) -> None:
+        if elapsed <= 0:
+            return
+        with self.lock:
+            self.recent_yields.append(found / elapsed)
+
+
+def _stop(process) -> None:
+    # creduce runs its passes and the interestingness tests in child processes, stop the whole group
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        process.wait()
+
+
+# Runs the creduce `command` until it finishes, the budget decides to stop it or `time_left` seconds (the rest
+# of the run's --timeout) are used up. count_found returns the number of interesting candidates found so far.
+# creduce runs in its own session so its whole process group can be stopped, it therefore does not see Ctrl-C
+# and is stopped here whenever this function is left, also by an exception.
+# Returns the number of candidates found and the seconds it ran.
+def run_with_budget(command, budget, count_found, time_left, poll_interval=0.5, **popen_args):
+    start = time.monotonic()
+    process = subprocess.Popen(command, start_new_session=True, **popen_args)
+    found = 0
+    last_found = 0.0
+    reason = None
+    try:
+        while True:
+            try:
+                process.wait(timeout=poll_interval)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            elapsed = time.monotonic() - start
+            current = count_found()
+            if current > found:
+                found = current
+                last_found = elapsed
+            if budget.stopped.is_set():
+                reason = "the run being stopped"
+            elif elapsed >= time_left:
+                reason = "the run's timeout"
+            elif not budget.keep_running(elapsed, found, elapsed - last_found):
+                reason = "its budget"
+            if reason is not None:
+                break
+    finally:
+        if process.poll() is None:
+            _stop(process)
+    elapsed = time.monotonic() - start
+    found = max(found, count_found())
+    # An interrupted invocation says nothing about the yield
+    if not budget.stopped.is_set():
+        budget.record(found, elapsed)
+    if reason is not None:
+        logging.info("Stopped creduce after %.1f seconds because of %s (%d interesting candidates)", elapsed, reason, found)
+    else:
+        logging.info("CReduce finished after %.1f seconds (%d interesting candidates)", elapsed, found)
+    return found, elapsed
@@ -0,0 +1,43 @@
+import os
+import json
+import logging
+import tempfile
+
+
+# Checkpoints of a single run (see new_run). The state is rewritten after every iteration into the output
+# directory, so a killed run can continue with --resume from the last finished iteration.
+
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+
+# Bump whenever the layout of the state changes so old checkpoints are not resumed from
+CHECKPOINT_FORMAT_VERSION = 2
+
+
+def checkpoint_path(output) -> str:
+    return os.path.join(output, CHECKPOINT_FILE_NAME)
+
+
+def load_checkpoint(output):
+    path = checkpoint_path(output)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+        return None
+    if data.get("version") != CHECKPOINT_FORMAT_VERSION:
+        logging.warning("Ignoring checkpoint %s with outdated format", path)
+        return None
+    return data["state"]
+
+
+# Written to a temporary file first and then renamed, so a crash leaves either the old or the new checkpoint
+def save_checkpoint(output, state) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=output, prefix=".checkpoint_")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"version": CHECKPOINT_FORMAT_VERSION, "state": state}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path(output))
@@ -0,0 +1,102 @@
+import os
+import re
+import gzip
+import json
+import time
+import shutil
+import threading
+
+
+# Structured event stream of a single run (see new_run), one JSON object per line in <output>/events.jsonl.
+# Every event has an "event" type and a "time", the other fields depend on the type:
+# - run_start: arguments of the run, csmith base seed, whether it was resumed from a checkpoint
+# - candidate: iteration, candidate path, heuristic value or the stage that rejected it
+# - iteration: iteration, lineage and parents reduced in it, frontier size, best candidate of the frontier with its sizes, global best
+# - run_end: best candidate with its sizes and heuristic, number of iterations, elapsed time
+# Once the stream grows beyond max_bytes it is compressed to events-<n>.jsonl.gz and started anew,
+# read_events returns the events of all segments in order. The position of the stream is stored in every
+# checkpoint, a resumed run drops the events emitted after it so no iteration is in the stream twice.
+
+EVENTS_FILE_NAME = "events.jsonl"
+EVENT_SCHEMA_VERSION = 1
+
+SEGMENT_PATTERN = re.compile(r"events-(\d+)\.jsonl\.gz$")
+
+
+def rotated_segments(output) -> list:
+    if not os.path.isdir(output):
+        return []
+    segments = []
+    for name in os.listdir(output):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            segments.append((int(match.group(1)), os.path.join(output, name)))
+    return [path for _, path in sorted(segments)]
+
+
+class EventLog:
+    # Appends to an existing stream, so a resumed run continues the stream of the interrupted one from
+    # `resume_position` (see position)
+    def __init__(self, output, max_bytes=64 * 1024 * 1024, resume_position=None):
+        self.output = output
+        self.path = os.path.join(output, EVENTS_FILE_NAME)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        if resume_position is not None:
+            self._truncate(resume_position)
+        self.file = open(self.path, "a")
+
+    # Number of rotated segments and offset in the current file after the last event
+    def position(self) -> list:
+        with self.lock:
+            return [len(rotated_segments(self.output)), self.file.tell()]
+
+    def _truncate(self, position) -> None:
+        segments, offset = position
+        rotated = rotated_segments(self.output)
+        if len(rotated) > segments:
+            # The stream was rotated after the position, continue the segment that contains it. Its events
+            # are restored before the later segments are removed, so a crash in between only repeats this.
+            with gzip.open(rotated[segments], "rb") as src, open(self.path + ".tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(self.path + ".tmp", self.path)
+            for path in rotated[segments:]:
+                os.remove(path)
+        if os.path.exists(self.path):
+            os.truncate(self.path, min(offset, os.path.getsize(self.path)))
+
+    def emit(self, event, **fields) -> None:
+        line = json.dumps({"event": event, "time": time.time(), "version": EVENT_SCHEMA_VERSION, **fields})
+        with self.lock:
+            self.file.write(line + "\n")
+            # Flushed per event so that a killed run loses at most the event being written
+            self.file.flush()
+            if self.max_bytes is not None and self.file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        self.file.close()
+        segment_path = os.path.join(self.output, f"events-{len(rotated_segments(self.output)) + 1}.jsonl.gz")
+        with open(self.path, "rb") as src, gzip.open(segment_path + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(segment_path + ".tmp", segment_path)
+        self.file = open(self.path, "w")
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+
+# Yields the events of a run directory in the order they were emitted, in a single pass over the segments.
+# A last line cut short by a crash is skipped.
+def read_events(output):
+    for path in rotated_segments(output) + [os.path.join(output, EVENTS_FILE_NAME)]:
+        if not os.path.exists(path):
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,218 @@
+import os
+import heapq
+import shutil
+import logging
+from srcreduce.size_cache import hash_file
+
+
+class CandidateFrontier:
+    # Priority frontier of scored candidates (higher heuristic first).
+    # - Candidates with content that was admitted before are dropped, re-reducing the same text is wasted work.
+    # - With max_size set, only the best max_size candidates are kept. Evicted candidates are deleted from
+    #   disk, as are iteration directories once none of their candidates are left.
+    # - Candidates can be tagged with the lineage (initial program) they derive from, and the best candidate
+    #   of a single lineage can be popped.
+    # Two heaps over the same entries (max for popping, min for eviction) with lazy deletion keep all
+    # operations logarithmic. Ties are broken by insertion order.
+    def __init__(self, max_size=None):
+        assert max_size is None or max_size > 0
+        self.max_size = max_size
+        self.best_heap = []
+        self.worst_heap = []
+        # entry id -> (heuristic, path, directory)
+        self.live = {}
+        self.seen_hashes = set()
+        # directory -> number of candidates from it that are live or were popped
+        self.directory_refs = {}
+        self.protected = set()
+        # Iteration directories whose candidates are still being pushed
+        self.open_directories = set()
+        # lineage -> max heap of the entries of that lineage, entry id -> lineage of tagged entries
+        self.lineage_heaps = {}
+        self.lineages = {}
+        self.lineage_sizes = {}
+        self.next_id = 0
+        self.evicted = 0
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.live)
+
+    # directory is the iteration directory the candidate lives in, candidates without one are never deleted.
+    # Returns whether the candidate was admitted.
+    def push(self, heuristic, path, directory=None, lineage=None) -> bool:
+        content_hash = hash_file(path)
+        if content_hash in self.seen_hashes:
+            self.duplicates += 1
+            return False
+        if self.max_size is not None and len(self.live) >= self.max_size:
+            worst_id = self._peek_worst()
+            if self.live[worst_id][0] >= heuristic:
+                # Not better than anything kept, treat it like an immediately evicted candidate
+                self.seen_hashes.add(content_hash)
+                self.evicted += 1
+                self._delete_candidate_files(path, directory)
+                self._prune_directory(directory)
+                return False
+            self._evict(worst_id)
+
+        self.seen_hashes.add(content_hash)
+        self._compact()
+        entry_id = self.next_id
+        self.next_id += 1
+        self.live[entry_id] = (heuristic, path, directory)
+        heapq.heappush(self.best_heap, (-heuristic, entry_id))
+        heapq.heappush(self.worst_heap, (heuristic, -entry_id))
+        if lineage is not None:
+            self.lineages[entry_id] = lineage
+            self.lineage_sizes[lineage] = self.lineage_sizes.get(lineage, 0) + 1
+            heapq.heappush(self.lineage_heaps.setdefault(lineage, []), (-heuristic, entry_id))
+        if directory is not None:
+            self.directory_refs[directory] = self.directory_refs.get(directory, 0) + 1
+        return True
+
+    def peek(self):
+        heuristic, path, _ = self.live[self._peek_best()]
+        return heuristic, path
+
+    # Lineage of the best candidate (None if it was pushed without one)
+    def peek_lineage(self):
+        return self.lineages.get(self._peek_best())
+
+    # Number of live candidates of a lineage
+    def count(self, lineage) -> int:
+        return self.lineage_sizes.get(lineage, 0)
+
+    # Popped candidates keep their files, they become the parent of the next iteration.
+    # With a lineage, the best candidate of that lineage is popped.
+    def pop(self, lineage=None):
+        if lineage is None:
+            entry_id = self._peek_best()
+            heapq.heappop(self.best_heap)
+        else:
+            heap = self.lineage_heaps[lineage]
+            while heap[0][1] not in self.live:
+                heapq.heappop(heap)
+            entry_id = heapq.heappop(heap)[1]
+        heuristic, path, _ = self.live.pop(entry_id)
+        self._forget_lineage(entry_id)
+        return heuristic, path
+
+    def _forget_lineage(self, entry_id) -> None:
+        lineage = self.lineages.pop(entry_id, None)
+        if lineage is not None:
+            self.lineage_sizes[lineage] -= 1
+
+    # Files of protected candidates (e.g. the global best) are never deleted
+    def protect(self, path) -> None:
+        self.protected.add(path)
+
+    # Brackets pushing the candidates of an iteration directory, the directory is not pruned in between.
+    # Afterwards it is deleted if pruning is enabled and none of its candidates made it into the frontier.
+    def open_directory(self, directory) -> None:
+        self.open_directories.add(directory)
+
+    def release_directory(self, directory) -> None:
+        self.open_directories.discard(directory)
+        self._prune_directory(directory)
+
+    # JSON serializable state for checkpoints
+    def state(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "live": [
+                [entry_id, heuristic, path, directory, self.lineages.get(entry_id)]
+                for entry_id, (heuristic, path, directory) in self.live.items()
+            ],
+            "seen_hashes": sorted(self.seen_hashes),
+            "directory_refs": self.directory_refs,
+            "protected": sorted(self.protected),
+            "next_id": self.next_id,
+            "evicted": self.evicted,
+            "duplicates": self.duplicates,
+        }
+
+    # Candidates whose files are gone (e.g. evicted during an iteration that did not finish) are dropped
+    @classmethod
+    def from_state(cls, state):
+        frontier = cls(max_size=state["max_size"])
+        frontier.seen_hashes = set(state["seen_hashes"])
+        frontier.directory_refs = dict(state["directory_refs"])
+        frontier.protected = set(state["protected"])
+        frontier.next_id = state["next_id"]
+        frontier.evicted = state["evicted"]
+        frontier.duplicates = state["duplicates"]
+        for entry_id, heuristic, path, directory, lineage in state["live"]:
+            if not os.path.exists(path):
+                logging.warning("Dropping candidate %s from the frontier, its file is missing", path)
+                if directory is not None:
+                    frontier.directory_refs[directory] -= 1
+                continue
+            frontier.live[entry_id] = (heuristic, path, directory)
+            if lineage is not None:
+                frontier.lineages[entry_id] = lineage
+                frontier.lineage_sizes[lineage] = frontier.lineage_sizes.get(lineage, 0) + 1
+        frontier.best_heap = [(-heuristic, entry_id) for entry_id, (heuristic, _, _) in frontier.live.items()]
+        frontier.worst_heap = [(heuristic, -entry_id) for entry_id, (heuristic, _, _) in frontier.live.items()]
+        heapq.heapify(frontier.best_heap)
+        heapq.heapify(frontier.worst_heap)
+        frontier._rebuild_lineage_heaps()
+        return frontier
+
+    def _peek_best(self):
+        while self.best_heap[0][1] not in self.live:
+            heapq.heappop(self.best_heap)
+        return self.best_heap[0][1]
+
+    def _peek_worst(self):
+        while -self.worst_heap[0][1] not in self.live:
+            heapq.heappop(self.worst_heap)
+        return -self.worst_heap[0][1]
+
+    # Drops entries that were lazily deleted from one of the heaps once they make up most of it
+    def _compact(self) -> None:
+        if len(self.best_heap) + len(self.worst_heap) > 4 * len(self.live) + 64:
+            self.best_heap = [(-heuristic, entry_id) for entry_id, (heuristic, _, _) in self.live.items()]
+            self.worst_heap = [(heuristic, -entry_id) for entry_id, (heuristic, _, _) in self.live.items()]
+            heapq.heapify(self.best_heap)
+            heapq.heapify(self.worst_heap)
+            self._rebuild_lineage_heaps()
+
+    def _rebuild_lineage_heaps(self) -> None:
+        self.lineage_heaps = {}
+        for entry_id, lineage in self.lineages.items():
+            self.lineage_heaps.setdefault(lineage, []).append((-self.live[entry_id][0], entry_id))
+        for heap in self.lineage_heaps.values():
+            heapq.heapify(heap)
+
+    def _evict(self, entry_id) -> None:
+        _, path, directory = self.live.pop(entry_id)
+        heapq.heappop(self.worst_heap)
+        self._forget_lineage(entry_id)
+        self.evicted += 1
+        if directory is not None:
+            self.directory_refs[directory] -= 1
+        self._delete_candidate_files(path, directory)
+        self._prune_directory(directory)
+
+    def _delete_candidate_files(self, path, directory) -> None:
+        if directory is None or path in self.protected:
+            return
+        # The candidate and its binary from compile_source_code
+        for file_path in (path, path[:-2] + ".o"):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _prune_directory(self, directory) -> None:
+        if (
+            self.max_size is None
+            or directory is None
+            or directory in self.open_directories
+            or self.directory_refs.get(directory, 0) > 0
+            or not os.path.exists(directory)
+            or any(os.path.dirname(path) == directory for path in self.protected)
+        ):
+            return
+        logging.info("Pruning %s, none of its candidates are left in the frontier", directory)
+        shutil.rmtree(directory, ignore_errors=True)
+        self.directory_refs.pop(directory, None)
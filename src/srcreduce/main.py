@@ -7,49 +7,54 @@ import time
 import random
 import string
 import shutil
+import shlex
+import signal
+import glob
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.getcwd()+"/src/srcreduce/diopter")
 from diopter.compiler import Language
 from diopter.compiler import SourceProgram
 from diopter.sanitizer import Sanitizer
-from statistics import mean, quantiles
-
+from srcreduce.size_cache import SizeCache, hash_source
+from srcreduce.stats import PercentileList
+from srcreduce.binary_size import text_size
+from srcreduce.frontier import CandidateFrontier
+from srcreduce.prefetch import SourcePrefetcher
+from srcreduce.seeds import SeedStream, random_base_seed
+from srcreduce.checkpoint import checkpoint_path, load_checkpoint, save_checkpoint
+from srcreduce.profiling import Profiler, format_iteration
+from srcreduce.events import EventLog
+from srcreduce.results import ResultsStore, export_csv
+from srcreduce.budget import CreduceBudget, run_with_budget
+from srcreduce.bandit import NEW_LINEAGE, LineageBandit
+from srcreduce.sweep import load_grid, run_sweep
+from srcreduce.batch import BATCH_MODES, MAX_BATCH_RUNS, expand_batch_mode, run_adaptive_batch, run_batch, write_batch_csv_header
+from srcreduce.oracle import write_oracle_config, generate_oracle_script
+
+
+LOG_FORMAT = "%(asctime)s %(levelname)-8s %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 logging.basicConfig(
-    format="%(asctime)s %(levelname)-8s %(message)s",
+    format=LOG_FORMAT,
     level=logging.INFO,
-    datefmt="%Y-%m-%d %H:%M:%S",
+    datefmt=LOG_DATE_FORMAT,
     filename="srcreduce.log",
     filemode='a'
 )
 
-class PercentileList:
-    def __init__(self):
-        self.percentile_list = []
-
-    def add_item(self, item):
-        self.percentile_list.append(item)
-        self.percentile_list.sort()
+# Shared by every size measurement of the process, see init_size_cache
+size_cache = None
+# Timers of the current run, replaced at the start of every run
+profiler = Profiler()
 
-    def get_mean(self):
-        return mean(self.percentile_list)
-    
-    # Return percentiles at beginning and end of list (default: 1st and 99th percentile)
-    def get_percentile(self, percentile=99):
-        assert 0 < percentile < 100
-        quant = quantiles(self.percentile_list, n=100)
-        return (quant[100 - percentile], quant[percentile - 1])
-    
-    # Checks whether the percentiles are within dist_of_mean percent of the mean
-    def check_percentile(self, percentile=99, dist_from_mean=0.05):
-        assert 0 < dist_from_mean < 0.5
-        current_mean = self.get_mean()
-        lower_bound = current_mean - dist_from_mean*current_mean
-        upper_bound = current_mean + dist_from_mean*current_mean
-        lower_quant, upper_quant = self.get_percentile(percentile)
-        return lower_bound <= lower_quant and upper_quant <= upper_bound
 
-
-def generate_source_code(args):
+# Returns the source code and the csmith seed it was generated from (None for example files).
+# The first attempt uses `seed` if given, retries after failed sanitizer checks draw from `seeds`.
+def generate_source_code(args, seeds, seed=None):
     if args.example is not None:
         logging.info("Generating source code based on example file: %s", args.example)
         with open(args.example, "r") as f:
@@ -57,133 +62,402 @@ def generate_source_code(args):
     elif args.random:
         logging.info("Generating random source code")
         source_code = ""
-        # Generate random source code with csmith:
-        cmsmith_args = "--max-expr-complexity=" + str(args.csmith_max_expr_complexity)
-        cmsmith_args += " --max-block-depth=" + str(args.csmith_max_block_depth)
-        cmsmith_args += " --stop-by-stmt=" + str(args.csmith_stop_by_stmt)
-        cmsmith_args += " --seed=" + str(args.csmith_seed)
-        source_code = subprocess.check_output([args.csmith], universal_newlines=True)
-        src_code_diopter_obj = SourceProgram(code=source_code, language=Language.C)
-        sanitizer = Sanitizer()
-        # Note: csmith include path must be in CPATH
-        if not sanitizer.check_for_compiler_warnings(src_code_diopter_obj) and not sanitizer.check_for_ub_and_address_sanitizer_errors(src_code_diopter_obj):
-            logging.error("Generated source code contains compiler warnings or UB")
-            return generate_source_code(args)
+        # Generate random source code with csmith until a program passes the sanitizer checks:
+        while True:
+            if seed is None:
+                seed = next(seeds)
+            cmsmith_args = ["--max-expr-complexity", str(args.csmith_max_expr_complexity)]
+            cmsmith_args += ["--max-block-depth", str(args.csmith_max_block_depth)]
+            cmsmith_args += ["--stop-by-stmt", str(args.csmith_stop_by_stmt)]
+            cmsmith_args += ["--seed", str(seed)]
+            with profiler.phase("csmith"):
+                source_code = subprocess.check_output([args.csmith, *cmsmith_args], universal_newlines=True)
+            src_code_diopter_obj = SourceProgram(code=source_code, language=Language.C)
+            rejected_by = sanitizer_rejection(src_code_diopter_obj)
+            if rejected_by is None:
+                break
+            logging.error("Generated source code from csmith seed %d was rejected by %s", seed, rejected_by)
+            seed = None
     else:
         logging.error("No source code generation method specified")
         sys.exit(1)
 
-    return source_code
-
-def gen_and_save_src_code(args, init_iter):
-    source_code = generate_source_code(args)
+    return source_code, seed
+
+# Sanitizer checks in order of cost, the (cheaper) compiler warnings check first and then the UB and address
+# sanitizer run. Returns the name of the rejecting stage (the same as its profiler phase) or None if the code passes.
+def sanitizer_rejection(src_code_diopter_obj):
+    sanitizer = Sanitizer()
+    # Note: csmith include path must be in CPATH
+    with profiler.phase("sanitizer_warnings"):
+        if not sanitizer.check_for_compiler_warnings(src_code_diopter_obj):
+            return "sanitizer_warnings"
+    with profiler.phase("sanitizer_ub"):
+        if not sanitizer.check_for_ub_and_address_sanitizer_errors(src_code_diopter_obj):
+            return "sanitizer_ub"
+    return None
+
+def gen_and_save_src_code(args, init_iter, seeds, prefetcher=None):
+    if prefetcher is not None:
+        source_code, seed = prefetcher.get()
+    else:
+        source_code, seed = generate_source_code(args, seeds)
 
     src_code_path = args.output + "/init" + str(init_iter) + ".c"
-    
+
+    if seed is not None:
+        logging.info("Source code %s was generated from csmith seed %d", src_code_path, seed)
     logging.info("Writing source code to file: %s", src_code_path)
     # Write source code to file
     with open(src_code_path, "w") as f:
         f.write(source_code)
 
-    return src_code_path
+    return src_code_path, seed
+
+def create_run_scratch_dir(args) -> str:
+    if args.scratch_dir is not None:
+        os.makedirs(args.scratch_dir, exist_ok=True)
+    args.run_scratch_dir = os.path.abspath(tempfile.mkdtemp(prefix="srcreduce-", dir=args.scratch_dir))
+    logging.info("Using scratch directory %s", args.run_scratch_dir)
+    return args.run_scratch_dir
+
+
+def remove_run_scratch_dir(args) -> None:
+    if getattr(args, "run_scratch_dir", None) is not None:
+        shutil.rmtree(args.run_scratch_dir, ignore_errors=True)
+        args.run_scratch_dir = None
+
+
+# Every thread of a run (main loop and candidate evaluation workers) gets its own scratch directory,
+# so fixed file names like temp.o never collide
+def get_scratch_dir(args) -> str:
+    if getattr(args, "run_scratch_dir", None) is None:
+        create_run_scratch_dir(args)
+    worker_dir = os.path.join(args.run_scratch_dir, f"worker-{threading.get_ident()}")
+    os.makedirs(worker_dir, exist_ok=True)
+    return worker_dir
+
+
+# Precompiles the csmith runtime header for the configured compiler and flag, so that compiles of the
+# (small) candidates do not spend most of their time parsing it. Returns the compiler arguments that
+# make a compile use the precompiled header, or no arguments if it cannot be built.
+def build_precompiled_header(args) -> list:
+    header_path = os.path.join(args.csmith_include, "csmith.h")
+    if args.no_pch or not os.path.exists(header_path):
+        return []
+
+    try:
+        version = subprocess.check_output([args.compiler, "--version"], stderr=subprocess.STDOUT, universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    is_clang = "clang" in version
+    # C++ drivers (e.g. g++-13) compile the .c candidates as C++, the header has to match
+    header_language = "c++-header" if "++" in os.path.basename(args.compiler) else "c-header"
+
+    pch_dir = os.path.join(args.run_scratch_dir, "pch")
+    os.makedirs(pch_dir, exist_ok=True)
+    # gcc picks up <dir>/csmith.h.gch for #include "csmith.h" when <dir> is searched first,
+    # clang has to be given the precompiled header explicitly
+    pch_path = os.path.join(pch_dir, "csmith.h.pch" if is_clang else "csmith.h.gch")
+    command = [args.compiler, "-x", header_language, header_path, "-o", pch_path]
+    if args.compiler_flag:
+        command.append("-" + args.compiler_flag)
+    command += ["-w", f"-I{args.csmith_include}"]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        logging.warning("Building the precompiled header failed, compiling without it:\n%s", result.stderr)
+        return []
+
+    logging.info("Using precompiled header %s", pch_path)
+    if is_clang:
+        return ["-include-pch", pch_path]
+    return [f"-I{pch_dir}"]
+
 
 def new_run(args, opt_category_param='', save_iters=False):
+    global profiler
+    profiler = Profiler()
+    create_run_scratch_dir(args)
+    args.pch_args = build_precompiled_header(args)
     start_time: int = time.time()
     # counts iterations
     iter: int = 0
     # counts iterations of new sampled codes
     init_iter: int = 0
     
-    candidates_pq = []
+    candidates_pq = CandidateFrontier(max_size=args.frontier_size)
+    # Content hashes of all candidates that reached the evaluation pool, and rejections per filter stage
+    seen_candidate_hashes = set()
+    rejected_candidates = Counter()
     best_code_path = None
     best_code_heuristic = None
     best_code_init = None
-    next_code_path = None
     next_code_heuristic = None
     next_code_init = args.output + "/init0.c"
+    # Rows for the batch CSV, written by the batch scheduler
+    csv_rows = []
+    size, bin_size = None, None
+    # Time spent reducing before this process took over the run (resumed runs)
+    elapsed_time = 0
+
+    checkpoint = load_checkpoint(args.output) if args.resume else None
+    if checkpoint is not None:
+        logging.info("Resuming from checkpoint after iteration %d", checkpoint["iter"])
+        iter = checkpoint["iter"]
+        init_iter = checkpoint["init_iter"]
+        candidates_pq = CandidateFrontier.from_state(checkpoint["frontier"])
+        seen_candidate_hashes = set(checkpoint["seen_candidate_hashes"])
+        rejected_candidates = Counter(checkpoint["rejected_candidates"])
+        best_code_path = checkpoint["best_code_path"]
+        best_code_heuristic = checkpoint["best_code_heuristic"]
+        best_code_init = checkpoint["best_code_init"]
+        next_code_init = checkpoint["next_code_init"]
+        csv_rows = [tuple(row) for row in checkpoint["csv_rows"]]
+        size, bin_size = checkpoint["last_sizes"]
+        elapsed_time = checkpoint["elapsed_time"]
+        # Leftovers of the iteration that was interrupted, it is run again
+        for leftover in [args.output + f"/iteration-{iter + 1}", *glob.glob(args.output + f"/iteration-{iter + 1}-*")]:
+            shutil.rmtree(leftover, ignore_errors=True)
+        # Seeds handed out to programs that were still being prefetched are skipped, not reused
+        seeds = SeedStream(checkpoint["seed_base"], args.seed_shard, args.seed_shards)
+        seeds.position = checkpoint["seed_position"]
+    else:
+        seeds = SeedStream(args.csmith_seed, args.seed_shard, args.seed_shards)
 
-    first_candidate = gen_and_save_src_code(args, init_iter)
-    candidates_pq.append((0, first_candidate))
-
-    if save_iters:
-        size, bin_size = calculate_source_and_binary_size(args, next_code_init)
-        with open(args.batch_output_csv, "a+") as f:
-            f.write(f"Source,{size},0\n")
-            f.write(f"Binary,{bin_size},0\n") 
-    
-    logging.info("Reducing")
-    start_time = time.time()
-
-    while start_time + args.timeout > time.time() and iter < args.max_iterations:
-        iter += 1
-        if len(candidates_pq) == 0 and args.regenerate:
-            logging.info("No candidates left, generating new source code")
-            init_iter += 1
-            next_code_init = gen_and_save_src_code(args, init_iter)
-            next_code_path = next_code_init
+    # With the bandit, every candidate is tagged with its lineage (the init_iter of the program it derives from)
+    bandit = None
+    if args.lineage_bandit:
+        if checkpoint is not None and checkpoint.get("bandit") is not None:
+            bandit = LineageBandit.from_state(checkpoint["bandit"])
         else:
-            candidates_pq.sort(reverse=True)
-            next_code_path = candidates_pq.pop(0)[1]
-        
-        logging.info("Init code iter %d", init_iter)
-        logging.info("Iteration %d", iter)
+            bandit = LineageBandit(exploration=args.bandit_exploration)
 
-        candidates_dir: str = generate_reduced_source_code_candidate(args, next_code_path, iter)
-
-        logging.info("Compiling candidates")
-        for candidate in os.listdir(candidates_dir):
-            if not candidate.endswith(".c"):
-                continue
-            
-            candidate = os.path.join(candidates_dir, candidate)
-
-            # Sanitizer check
-            with open(candidate, "r") as f:
-                source_code = f.read()
-            src_code_diopter_obj = SourceProgram(code=source_code, language=Language.C)
-            sanitizer = Sanitizer()
-            # Note: csmith include path must be in CPATH
-            if not sanitizer.check_for_compiler_warnings(src_code_diopter_obj) and not sanitizer.check_for_ub_and_address_sanitizer_errors(src_code_diopter_obj):
-                continue
+    # Fresh programs are generated in the background when the frontier may run dry and be regenerated
+    prefetcher = None
+    if args.random and args.regenerate and args.prefetch_depth > 0:
+        prefetcher = SourcePrefetcher(lambda seed: generate_source_code(args, seeds, seed), args.prefetch_depth, seeds)
 
-            binary_path: str = compile_source_code(args, candidate)
-            if binary_path is None:
-                logging.error("Compilation failed")
-                continue
+    try:
+        if checkpoint is None:
+            first_candidate, first_seed = gen_and_save_src_code(args, init_iter, seeds, prefetcher)
+            if bandit is not None:
+                # The heuristic value of the program itself, the starting point of its lineage
+                bandit.add_lineage(init_iter, first_candidate, first_seed, calculate_heuristic_value(args, first_candidate, first_candidate))
+                candidates_pq.push(0, first_candidate, lineage=init_iter)
+            else:
+                candidates_pq.push(0, first_candidate)
 
-            heuristic_value: float = calculate_heuristic_value(
-                args,
-                next_code_path,
-                candidate,
-            )
+            if save_iters:
+                size, bin_size = calculate_source_and_binary_size(args, next_code_init)
+                csv_rows.append(("Source", size, 0))
+                csv_rows.append(("Binary", bin_size, 0))
+    
+        # Events of the interrupted iteration are dropped, it is run again
+        events = EventLog(
+            args.output,
+            max_bytes=args.event_log_max_bytes,
+            resume_position=None if checkpoint is None else checkpoint.get("events_position"),
+        )
+        events.emit(
+            "run_start",
+            args={name: value for name, value in vars(args).items() if isinstance(value, (str, int, float, bool, type(None)))},
+            category=opt_category_param,
+            seed_base=seeds.base,
+            resumed=checkpoint is not None,
+            iteration=iter,
+        )
 
-            candidates_pq.append((heuristic_value, candidate))
+        results_store = None
+        results_run_id = None
+        if args.results_db is not None:
+            results_store = ResultsStore(args.results_db)
+            if checkpoint is not None and checkpoint.get("results_run_id") is not None:
+                results_run_id = checkpoint["results_run_id"]
+                results_store.resume_run(results_run_id, iter)
+            else:
+                results_run_id = results_store.start_run(args, opt_category_param, seeds.base)
+
+        logging.info("Reducing")
+        start_time = time.time() - elapsed_time
+        # creduce invocations never run past the end of the run
+        args.run_deadline = start_time + args.timeout
+        args.creduce_budget = None
+        if args.adaptive_creduce_budget:
+            args.creduce_budget = CreduceBudget(args.timeout_creduce_iteration, args.creduce_budget_min, args.creduce_budget_max)
+
+        while start_time + args.timeout > time.time() and iter < args.max_iterations:
+            if bandit is None and len(candidates_pq) == 0 and not args.regenerate:
+                logging.info("No candidates left and regeneration is disabled, stopping")
+                break
+            iter += 1
+            global_best_before = best_code_heuristic
+            lineage = None
+            new_lineage = False
+            if bandit is not None:
+                lineage = bandit.choose([l for l in bandit.lineages if candidates_pq.count(l) > 0], allow_new=args.regenerate)
+                if lineage is None:
+                    logging.info("No candidates left in any lineage")
+                    break
+            if lineage == NEW_LINEAGE or (bandit is None and len(candidates_pq) == 0 and args.regenerate):
+                if lineage == NEW_LINEAGE:
+                    logging.info("Starting a new lineage, generating new source code")
+                else:
+                    logging.info("No candidates left, generating new source code")
+                init_iter += 1
+                next_code_init, seed = gen_and_save_src_code(args, init_iter, seeds, prefetcher)
+                parents = [next_code_init]
+                if bandit is not None:
+                    bandit.add_lineage(init_iter, next_code_init, seed, calculate_heuristic_value(args, next_code_init, next_code_init))
+                    lineage = init_iter
+                    new_lineage = True
+            else:
+                available = len(candidates_pq) if lineage is None else candidates_pq.count(lineage)
+                if lineage is not None:
+                    logging.info("Continuing lineage %s", lineage)
+                    next_code_init = bandit.lineages[lineage]["init"]
+                # The best beam_width candidates are reduced in this iteration (at least one, as before)
+                parents = [candidates_pq.pop(lineage)[1] for _ in range(max(1, min(args.beam_width, available)))]
+        
+            logging.info("Init code iter %d", init_iter)
+            logging.info("Iteration %d", iter)
 
-        candidates_pq.sort(reverse=True)
-        if len(candidates_pq) == 0:
-            logging.info("No new candidates this iteration")
-            if save_iters:
-                with open(args.batch_output_csv, "a+") as f:
-                    f.write(f"Source,{size},{iter}\n")
-                    f.write(f"Binary,{bin_size},{iter}\n") 
-        else:
-            best_candidate_this_iter = candidates_pq[0][1]
-            best_heuristic_this_iter = candidates_pq[0][0]
-            size, bin_size = calculate_source_and_binary_size(args, best_candidate_this_iter)
-            logging.info("Best candidate this iteration: %s", best_candidate_this_iter)
-            logging.info("Best heuristic value this iteration: %f", best_heuristic_this_iter)
-            logging.info("Best candidate info: %s", (size, bin_size))
-            if save_iters:
-                with open(args.batch_output_csv, "a+") as f:
-                    f.write(f"Source,{size},{iter}\n")
-                    f.write(f"Binary,{bin_size},{iter}\n") 
-            if best_code_heuristic is None or best_heuristic_this_iter > best_code_heuristic:
-                logging.info("This iters best is global best")
-                best_code_path = best_candidate_this_iter
-                best_code_heuristic = best_heuristic_this_iter
-                best_code_init = next_code_init
+            # Every parent is reduced by its own creduce in its own iteration directory and scratch directory
+            with ThreadPoolExecutor(max_workers=len(parents)) as pool:
+                try:
+                    candidates_dirs = list(pool.map(
+                        lambda beam_index: generate_reduced_source_code_candidate(args, parents[beam_index], iter, beam_index, len(parents)),
+                        range(len(parents)),
+                    ))
+                except BaseException:
+                    # Ctrl-C or SIGTERM, stop the budgeted creduce runs instead of waiting for their budget
+                    if args.creduce_budget is not None:
+                        args.creduce_budget.stop()
+                    raise
+
+            logging.info("Compiling candidates")
+            # The children of all parents are merged into one frontier, each is scored against its own parent.
+            # Sorted so that the merge order, and thereby tie breaking in the queue, does not depend on the file system
+            candidates = []
+            for parent, candidates_dir in zip(parents, candidates_dirs):
+                parent_size = os.path.getsize(parent)
+                for candidate in sorted(os.listdir(candidates_dir)):
+                    if not candidate.endswith(".c"):
+                        continue
+                    candidate = os.path.join(candidates_dir, candidate)
+                    rejected_by = prefilter_candidate(candidate, iter, parent_size, seen_candidate_hashes)
+                    if rejected_by is not None:
+                        rejected_candidates[rejected_by] += 1
+                        profiler.count("rejected_" + rejected_by)
+                        events.emit("candidate", iteration=iter, path=candidate, heuristic=None, rejected_by=rejected_by)
+                        if results_store is not None:
+                            results_store.add_candidate(results_run_id, iter, candidate, None, None, None, rejected_by)
+                        continue
+                    candidates.append((parent, candidate, candidates_dir))
+                candidates_pq.open_directory(candidates_dir)
+            # Sizes of the scored candidates, filled in by calculate_heuristic_value
+            candidates_info = {}
+            best_heuristic_of_children = None
+            with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+                results = pool.map(lambda item: evaluate_candidate(args, item[0], item[1], candidates_info), candidates)
+                for (_, candidate, candidates_dir), (heuristic_value, rejected_by) in zip(candidates, results):
+                    events.emit("candidate", iteration=iter, path=candidate, heuristic=heuristic_value, rejected_by=rejected_by)
+                    if results_store is not None:
+                        candidate_size, candidate_bin_size = candidates_info.get(candidate, (None, None))
+                        results_store.add_candidate(results_run_id, iter, candidate, candidate_size, candidate_bin_size, heuristic_value, rejected_by)
+                    if rejected_by is not None:
+                        rejected_candidates[rejected_by] += 1
+                        profiler.count("rejected_" + rejected_by)
+                        continue
+                    if best_heuristic_of_children is None or heuristic_value > best_heuristic_of_children:
+                        best_heuristic_of_children = heuristic_value
+                    candidates_pq.push(heuristic_value, candidate, candidates_dir, lineage)
+            for candidates_dir in candidates_dirs:
+                candidates_pq.release_directory(candidates_dir)
+            profiler.count("candidates_evaluated", len(candidates))
+            logging.info("Evaluated %d candidates, rejected so far: %s", len(candidates), dict(rejected_candidates))
+            logging.info("Frontier size: %d (evicted: %d, duplicates: %d)", len(candidates_pq), candidates_pq.evicted, candidates_pq.duplicates)
+
+            best_heuristic_this_iter, best_candidate_this_iter = None, None
+            if len(candidates_pq) == 0:
+                logging.info("No new candidates this iteration")
+                if save_iters:
+                    csv_rows.append(("Source", size, iter))
+                    csv_rows.append(("Binary", bin_size, iter))
             else:
-                logging.info("No new global best found")
+                best_heuristic_this_iter, best_candidate_this_iter = candidates_pq.peek()
+                size, bin_size = calculate_source_and_binary_size(args, best_candidate_this_iter)
+                logging.info("Best candidate this iteration: %s", best_candidate_this_iter)
+                logging.info("Best heuristic value this iteration: %f", best_heuristic_this_iter)
+                logging.info("Best candidate info: %s", (size, bin_size))
+                if save_iters:
+                    csv_rows.append(("Source", size, iter))
+                    csv_rows.append(("Binary", bin_size, iter))
+                if best_code_heuristic is None or best_heuristic_this_iter > best_code_heuristic:
+                    logging.info("This iters best is global best")
+                    best_code_path = best_candidate_this_iter
+                    best_code_heuristic = best_heuristic_this_iter
+                    candidates_pq.protect(best_code_path)
+                    best_lineage = candidates_pq.peek_lineage()
+                    best_code_init = next_code_init if best_lineage is None else bandit.lineages[best_lineage]["init"]
+                else:
+                    logging.info("No new global best found")
+
+            if bandit is not None:
+                reward = bandit.record(lineage, best_heuristic_of_children, global_best_before, len(candidates), new_lineage)
+                logging.info("Lineage %s reward: %f", lineage, reward)
+
+            events.emit(
+                "iteration",
+                iteration=iter,
+                lineage=lineage,
+                init_iteration=init_iter,
+                parents=parents,
+                candidates=len(candidates),
+                frontier_size=len(candidates_pq),
+                best_candidate=best_candidate_this_iter,
+                best_heuristic=best_heuristic_this_iter,
+                source_size=size,
+                binary_size=bin_size,
+                global_best_heuristic=best_code_heuristic,
+            )
+            if results_store is not None:
+                results_store.add_iteration(results_run_id, iter, size, bin_size, best_heuristic_this_iter, len(candidates_pq))
+                # Everything up to the checkpoint has to be in the database when the run is resumed from it
+                results_store.flush()
+
+            save_checkpoint(args.output, {
+                "iter": iter,
+                "init_iter": init_iter,
+                "frontier": candidates_pq.state(),
+                "seen_candidate_hashes": sorted(seen_candidate_hashes),
+                "rejected_candidates": dict(rejected_candidates),
+                "best_code_path": best_code_path,
+                "best_code_heuristic": best_code_heuristic,
+                "best_code_init": best_code_init,
+                "next_code_init": next_code_init,
+                "csv_rows": csv_rows,
+                "last_sizes": [size, bin_size],
+                "elapsed_time": time.time() - start_time,
+                "seed_base": seeds.base,
+                "seed_position": seeds.position,
+                "results_run_id": results_run_id,
+                "events_position": events.position(),
+                "bandit": None if bandit is None else bandit.state(),
+            })
+
+            iteration_profile = profiler.end_iteration(iter)
+            if args.profile_summary:
+                logging.info(format_iteration(iteration_profile))
+    finally:
+        # Also when the run fails, the generations in flight must not outlive it
+        if prefetcher is not None:
+            prefetcher.close()
+
+    if best_code_path is None:
+        # Not a single candidate was scored, the initial program is the best code found
+        logging.info("No candidate was found, keeping the initial program %s", next_code_init)
+        best_code_path = best_code_init = next_code_init
+        best_code_heuristic = calculate_heuristic_value(args, next_code_init, next_code_init)
 
     best_file_dest_path = args.output + "/last.c"
     shutil.copyfile(best_code_path, best_file_dest_path)
@@ -193,61 +467,206 @@ def new_run(args, opt_category_param='', save_iters=False):
 
     # Used to print info in the end and retrieve info in batch mode
     info_dict = {}
+    calculate_heuristic_value(args, best_code_init, best_code_path, retrieve_info=info_dict)
     if args.batch_measurements is not None and not save_iters:
-        calculate_heuristic_value(args, best_code_init, best_code_path, retrieve_info=info_dict)
-        with open(args.batch_output_csv, "a+") as f:
-            f.write(f"Source,{info_dict['src']},{opt_category_param}\n")
-            f.write(f"Binary,{info_dict['bin']},{opt_category_param}\n")
-    else:
-        calculate_heuristic_value(args, best_code_init, best_code_path)
+        csv_rows.append(("Source", info_dict['src'], opt_category_param))
+        csv_rows.append(("Binary", info_dict['bin'], opt_category_param))
 
     if iter == args.max_iterations:
         logging.info("Finished after %d iterations", iter)
     else:
         logging.info("Finished after %d seconds", time.time() - start_time)
 
-    if args.batch_measurements is not None and not save_iters:
-        return info_dict['src'], info_dict['bin']
+    size_cache.save()
+
+    events.emit(
+        "run_end",
+        category=opt_category_param,
+        best_candidate=best_code_path,
+        best_init=best_code_init,
+        best_heuristic=best_code_heuristic,
+        source_size=info_dict.get('src'),
+        binary_size=info_dict.get('bin'),
+        iterations=iter,
+        elapsed_time=time.time() - start_time,
+    )
+    events.close()
+    if results_store is not None:
+        results_store.finish_run(results_run_id, iter, info_dict.get('src'), info_dict.get('bin'), best_code_heuristic)
+        results_store.close()
+
+    if bandit is not None:
+        bandit.save(args.output + "/lineages.json")
+
+    profile_path = args.output + "/profile.json"
+    profiler.save(profile_path)
+    logging.info("Wrote run profile to %s", profile_path)
+
+    return info_dict.get('src'), info_dict.get('bin'), csv_rows
+
+
+# Runs of a batch or sweep can run at the same time, so every run logs to <output>/srcreduce.log instead of
+# the shared log, starting with the line plotting/log_ingest.py splits runs by. Returns the handlers to restore.
+def start_run_log(args) -> list:
+    root = logging.getLogger()
+    previous = root.handlers[:]
+    for handler in previous:
+        root.removeHandler(handler)
+    handler = logging.FileHandler(os.path.join(args.output, "srcreduce.log"))
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+    root.addHandler(handler)
+    logging.info("Starting framework with the following arguments: %s", args)
+    return previous
+
+
+def end_run_log(previous) -> None:
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for handler in previous:
+        root.addHandler(handler)
+
+
+# Runs one run of a batch in its own output (and scratch) directory, see run_batch
+def execute_run_spec(base_args, spec):
+    args = argparse.Namespace(**vars(base_args))
+    for name, value in spec.overrides.items():
+        setattr(args, name, value)
+    args.output = base_args.output + str(spec.index)
+    # Every run of the batch draws its csmith programs from its own shard of the seed range
+    args.seed_shard = base_args.seed_shard + (spec.index - 1) * base_args.seed_shards
+    args.seed_shards = base_args.seed_shards * MAX_BATCH_RUNS
+    logging.info("Batch run %d, category %s: %s, logging to %s/srcreduce.log", spec.index, spec.category, spec.overrides, args.output)
+    cleanup_or_create_output_folder(args)
+    previous_log_handlers = start_run_log(args)
+    try:
+        return new_run(args, opt_category_param=spec.category, save_iters=spec.save_iters)
+    except Exception:
+        logging.exception("Batch run %d failed", spec.index)
+        return None
+    finally:
+        logging.info("Done")
+        remove_run_scratch_dir(args)
+        end_run_log(previous_log_handlers)
+
+
+# SIGTERM ends the process without unwinding, raise SystemExit instead so that runs clean up (stop creduce,
+# close the prefetcher) like on Ctrl-C
+def exit_on_sigterm() -> None:
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+
+# The runs of a batch or sweep draw from shards of one seed range, so a random base seed is chosen once for
+# all of them (and logged) instead of by every run
+def choose_csmith_seed(args) -> None:
+    if args.csmith_seed is None:
+        args.csmith_seed = random_base_seed()
+        logging.info("No csmith seed given, using base seed %d", args.csmith_seed)
+
+
+def init_size_cache(args) -> SizeCache:
+    global size_cache
+    size_cache = SizeCache(max_entries=args.size_cache_entries, backing_file=args.size_cache)
+    return size_cache
+
+
+# O(1)-ish checks run on the main thread before a candidate is handed to the evaluation pool, in order
+# of cost. Returns the name of the rejecting stage or None if the candidate passes.
+def prefilter_candidate(candidate, iteration, parent_size, seen_hashes):
+    # The copy of the parent creduce worked on. It is not queued again, once no candidates are left the
+    # run generates new source code (--regenerate) or stops, see new_run
+    if os.path.basename(candidate) == f"init_{iteration}.c":
+        return "parent_copy"
+    size = os.path.getsize(candidate)
+    # Special case for file that is always 500 bytes because only contains a single function declaration
+    if size <= 500:
+        return "too_small"
+    if size > parent_size:
+        return "larger_than_parent"
+    with open(candidate, "rb") as f:
+        content_hash = hash_source(f.read())
+    if content_hash in seen_hashes:
+        return "duplicate"
+    seen_hashes.add(content_hash)
+    return None
+
+
+# Checks, compiles and scores a single candidate, returns the heuristic value and the name of the
+# rejecting stage (None if the candidate was scored). Runs concurrently in the candidate evaluation pool of new_run.
+def evaluate_candidate(args, parent_code_path, candidate, candidates_info=None):
+    with open(candidate, "r") as f:
+        source_code = f.read()
+    src_code_diopter_obj = SourceProgram(code=source_code, language=Language.C)
+    rejected_by = sanitizer_rejection(src_code_diopter_obj)
+    if rejected_by is not None:
+        return None, rejected_by
+
+    binary_path: str = compile_source_code(args, candidate)
+    if binary_path is None:
+        return None, "compilation"
+
+    with profiler.phase("heuristic"):
+        return calculate_heuristic_value(
+            args,
+            parent_code_path,
+            candidate,
+            candidates_info=candidates_info,
+        ), None
+
+
+# The single compiler invocation used for every measured build (candidates, originals and the interestingness test)
+def compiler_command(args, source_code_path, binary_path) -> list:
+    command = [args.compiler, source_code_path, "-o", binary_path]
+    if args.compiler_flag:
+        command.append("-" + args.compiler_flag)
+    # The precompiled header directory has to be searched before the csmith include directory
+    command += ["-w", *getattr(args, "pch_args", []), f"-I{args.csmith_include}"]
+    return command
+
+
+def size_cache_key(args, source_code) -> str:
+    if size_cache is None:
+        init_size_cache(args)
+    return SizeCache.make_key(hash_source(source_code), args.compiler, args.compiler_flag, args.csmith_include)
 
 
 def calculate_source_and_binary_size(args, source_code_path):
     if source_code_path is None:
         logging.error("No source code path given")
         return 0, 0
-    size = os.path.getsize(source_code_path)
-
-    devnull = open(os.devnull, "w")
-
-    subprocess.run(
-        [
-            args.compiler,
-            f"{source_code_path}",
-            "-o",
-            "temp.o",
-            "-" + args.compiler_flag,
-            "-w",
-            f"-I{args.csmith_include}",
-        ],
-        stdout=devnull,
-        stderr=devnull,
-    )
+    with open(source_code_path, "rb") as f:
+        source_code = f.read()
+    size = len(source_code)
+
+    cache_key = size_cache_key(args, source_code)
+    cached = size_cache.get(cache_key)
+    if cached is not None:
+        profiler.count("size_cache_hits")
+        return cached
+    profiler.count("size_cache_misses")
+
+    binary_path = os.path.join(get_scratch_dir(args), "temp.o")
+
+    with profiler.phase("compile"):
+        subprocess.run(
+            compiler_command(args, source_code_path, binary_path),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
 
-    bin_size = calculate_size("temp.o")
+    bin_size = calculate_size(binary_path)
 
-    os.remove("temp.o")
+    os.remove(binary_path)
+
+    size_cache.put(cache_key, (size, bin_size))
 
     return size, bin_size
 
 
 def calculate_size(path) -> int:
-    return int(
-        subprocess.check_output(
-            ["size", path],
-            universal_newlines=True,
-        )
-        .split("\n")[1]
-        .split("\t")[0]
-    )
+    with profiler.phase("size"):
+        return text_size(path)
 
 
 def calculate_size_difference(
@@ -328,37 +747,63 @@ def calculate_heuristic_value(
     return reduced_bin_size / reduced_source_code_size
 
 
-def generate_reduced_source_code_candidate(args, source_code_path, iteration) -> str:
+# With a beam, parent beam_index of beam_size reduces into iteration-<iteration>-<beam_index> (the first one
+# into iteration-<iteration>) and, unless --creduce-jobs is given, the cores are split between the creduce runs of the beam
+def generate_reduced_source_code_candidate(args, source_code_path, iteration, beam_index=0, beam_size=1) -> str:
     credue_options = [
         "--save-temps",
         "--timeout",
         str(args.timeout_creduce),
     ]
+    creduce_jobs = getattr(args, "creduce_jobs", None)
+    if creduce_jobs is None and beam_size > 1:
+        creduce_jobs = max(1, (os.cpu_count() or 1) // beam_size)
+    if creduce_jobs is not None:
+        credue_options += ["--n", str(creduce_jobs)]
 
     # Get current location:
-    iteration_dir = args.output + f"/iteration-{iteration}"
+    iteration_dir_name = f"iteration-{iteration}" if beam_index == 0 else f"iteration-{iteration}-{beam_index}"
+    iteration_dir = os.path.abspath(os.path.join(args.output, iteration_dir_name))
     os.makedirs(iteration_dir, exist_ok=True)
 
-    new_source_code_path = args.output + f"/iteration-{iteration}/init_{iteration}.c"
+    new_source_code_path = iteration_dir + f"/init_{iteration}.c"
 
     shutil.copyfile(source_code_path, new_source_code_path)
 
-    # Remove iteration-{iteration} from the path (DO NOT REMOVE THIS, OTHERWISE CREDUCE WILL NOT WORK)
-    source_code_path_for_count_line_markers = new_source_code_path.split("/")[:-3] + [
-        new_source_code_path.split("/")[-1]
-    ]
-    source_code_path_for_count_line_markers = "/".join(
-        source_code_path_for_count_line_markers
-    )
+    # creduce runs in the scratch directory of this thread instead of the shared current working directory
+    creduce_dir = get_scratch_dir(args)
+
+    # Copy of the source code next to the interestingness test (DO NOT REMOVE THIS, OTHERWISE CREDUCE WILL NOT WORK)
+    source_code_path_for_count_line_markers = os.path.join(creduce_dir, os.path.basename(new_source_code_path))
 
     shutil.copyfile(source_code_path, source_code_path_for_count_line_markers)
 
     local_new_source_code_path = os.path.basename(new_source_code_path)
-
-    interestingness_test = f"""
+    interestingness_test_path = os.path.join(creduce_dir, "interestingness_test.sh")
+
+    # The original never changes during the creduce run, so its binary size is measured once (usually a cache hit)
+    # and baked into the test instead of recompiling the original on every creduce probe
+    _, original_bin_size = calculate_source_and_binary_size(args, source_code_path)
+
+    if args.python_oracle:
+        oracle_config_path = os.path.join(creduce_dir, "oracle_config.json")
+        # Shared by all creduce probes of the run
+        memo_dir = os.path.join(args.run_scratch_dir, "oracle-memo")
+        os.makedirs(memo_dir, exist_ok=True)
+        write_oracle_config(
+            oracle_config_path,
+            args,
+            compiler_command(args, local_new_source_code_path, "tmp.o"),
+            local_new_source_code_path,
+            original_bin_size,
+            iteration_dir,
+            memo_dir,
+        )
+        interestingness_test = generate_oracle_script(oracle_config_path)
+    else:
+        interestingness_test = f"""
 #!/bin/bash
-{args.compiler} {source_code_path} -o orig.o -{args.compiler_flag} -w -I{args.csmith_include}
-{args.compiler} {local_new_source_code_path} -o tmp.o -{args.compiler_flag} -w -I{args.csmith_include}
+{shlex.join(compiler_command(args, local_new_source_code_path, "tmp.o"))}
 ./tmp.o
 
 # If the new binary does not run at all, it is not interesting
@@ -372,7 +817,7 @@ if [ $(wc -c < {local_new_source_code_path}) -lt 500 ]; then
 fi
 
 # If the new binary is bigger than the original, it is interesting
-if [ $(size tmp.o | awk '{{print $1}}' | tail -n 1) -ge $(size orig.o | awk '{{print $1}}' | tail -n 1) ]; then
+if [ $(size tmp.o | awk '{{print $1}}' | tail -n 1) -ge {original_bin_size} ]; then
     # Save the file for later and add random number to the end
     # Generate unique random string:
     random_string=$(mktemp XXXXXXXXXXXXXXXX)
@@ -384,52 +829,70 @@ fi
 exit 1
 """
 
-    with open("interestingness_test.sh", "w") as f:
+    with open(interestingness_test_path, "w") as f:
         f.write(interestingness_test)
 
-    os.chmod("interestingness_test.sh", 0o777)
+    os.chmod(interestingness_test_path, 0o777)
 
     logging.info("Running creduce")
 
+    creduce_command = [
+        args.creduce,
+        interestingness_test_path,
+        new_source_code_path,
+        *credue_options,
+    ]
+    # creduce creates its temporary directories below TMPDIR, keep them in the scratch directory as well
+    creduce_env = {**os.environ, "TMPDIR": creduce_dir}
+
+    if getattr(args, "creduce_budget", None) is not None:
+        with profiler.phase("creduce"):
+            run_with_budget(
+                creduce_command,
+                args.creduce_budget,
+                lambda: len(glob.glob(os.path.join(iteration_dir, "interesting_*.c"))),
+                args.run_deadline - time.time(),
+                cwd=creduce_dir,
+                env=creduce_env,
+            )
+        return iteration_dir
+
     try:
-        subprocess.run(
-            [
-                args.creduce,
-                "interestingness_test.sh",
-                new_source_code_path,
-                *credue_options,
-            ],
-            timeout=args.timeout_creduce_iteration,
-        )
+        with profiler.phase("creduce"):
+            subprocess.run(
+                creduce_command,
+                cwd=creduce_dir,
+                env=creduce_env,
+                timeout=args.timeout_creduce_iteration,
+            )
     except subprocess.TimeoutExpired:
+        profiler.count("creduce_timeouts")
         logging.info("CReduce timed out")
 
     return iteration_dir
 
 
+# Builds the candidate exactly like the measurements do and records its sizes in the size cache,
+# so scoring and reporting the candidate later reuse this binary instead of compiling it again
 def compile_source_code(args, source_code_path) -> str:
     source_file_binary = source_code_path[:-2] + ".o"
 
-    devnull = open(os.devnull, "w")
-
-    # Use gcc to compile the source code
-    try:
-        subprocess.run(
-            [
-                args.compiler,
-                source_code_path,
-                "-o",
-                source_file_binary,
-                f"-I{args.csmith_include}",
-            ],
-            stdout=devnull,
-            stderr=devnull,
+    with profiler.phase("compile"):
+        result = subprocess.run(
+            compiler_command(args, source_code_path, source_file_binary),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
         )
-    except subprocess.CalledProcessError as e:
+    if result.returncode != 0:
         # Compilation failed, print the error message and return None
-        logging.error("Compilation failed with error:\n", e.output.decode())
+        logging.error("Compilation failed with error:\n%s", result.stderr)
         return None
 
+    with open(source_code_path, "rb") as f:
+        source_code = f.read()
+    size_cache.put(size_cache_key(args, source_code), (len(source_code), calculate_size(source_file_binary)))
+
     # Compilation succeeded, return the path to the binary
     binary_path = os.path.abspath(source_file_binary)
     return binary_path
@@ -444,15 +907,18 @@ def cleanup_or_create_output_folder(args) -> None:
     # Cleanup output dir
     if not os.path.exists(args.output):
         os.makedirs(args.output)
+    elif args.resume and os.path.exists(checkpoint_path(args.output)):
+        # Keep the state of the interrupted run
+        logging.info("Keeping output directory %s to resume from its checkpoint", args.output)
     else:
         # Remove everything in the output directory
         shutil.rmtree(args.output)
         os.makedirs(args.output)
 
 
-def main():
+def build_parser(add_help=True) -> argparse.ArgumentParser:
     # Create argument parser
-    parser = argparse.ArgumentParser(description="Source code reducer")
+    parser = argparse.ArgumentParser(description="Source code reducer", add_help=add_help)
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="show verbose output"
     )
@@ -499,34 +965,122 @@ def main():
     parser.add_argument("--csmith-max-expr-complexity", type=int, default=10, help="maximum expression complexity")
     parser.add_argument("--csmith-max-block-depth", type=int, default=5, help="maximum block depth")
     parser.add_argument("--csmith-stop-by-stmt", type=int, default=100, help="stop generating code after this many statements")
-    parser.add_argument("--csmith-seed", type=int, default=0, help="seed for csmith")
+    parser.add_argument("--csmith-seed", type=int, default=None, help="base seed for csmith (default: random, logged for replays)")
+    parser.add_argument("--seed-shard", type=int, default=0, help="index of this shard, shard i of n uses the csmith seeds base + i + k * n")
+    parser.add_argument("--seed-shards", type=int, default=1, help="number of shards the csmith seed range is split into")
     parser.add_argument("--creduce", type=str, help="path to creduce", required=True)
+    parser.add_argument("--creduce-jobs", type=int, default=None, help="number of processes every creduce run uses (default: creduce's choice, the cores split between the runs of a beam)")
     parser.add_argument(
         "--candidates", type=int, help="number of cvsise canidates", default=20
     )
     parser.add_argument("--compiler", type=str, help="path to compiler", required=True)
     parser.add_argument("--compiler-flag", type=str, help="compiler flag", default="")
-    parser.add_argument("--regenerate", action="store_true", help="generate new code if no new candidates are found for the current initial code", default=False)
+    parser.add_argument("--regenerate", action="store_true", help="generate new code if no new candidates are found for the current initial code (otherwise the run stops)", default=False)
 
     parser.add_argument("--batch-measurements", type=str, help="special modes used to collect a lot of measurements in order to create plots", default=None)
     parser.add_argument("--batch-output-csv", type=str, help="used together with batch measurement mode, specifies path to output csv file", default='data.csv')
+    parser.add_argument("--adaptive-creduce-budget", action="store_true", help="give every creduce run a time budget based on how many interesting candidates recent runs found per second, instead of a fixed --timeout-creduce-iteration", default=False)
+    parser.add_argument("--creduce-budget-min", type=float, help="time after which an unproductive creduce run can be stopped with --adaptive-creduce-budget (default: a quarter of --timeout-creduce-iteration)", default=None)
+    parser.add_argument("--creduce-budget-max", type=float, help="longest time a productive creduce run is extended to with --adaptive-creduce-budget (default: four times --timeout-creduce-iteration)", default=None)
+    parser.add_argument("--adaptive-repetitions", action="store_true", help="in batch mode, repeat each category only until its mean sizes are known precisely enough, within the same total budget", default=False)
+    parser.add_argument("--min-repetitions", type=int, help="minimum number of runs per category with --adaptive-repetitions", default=3)
+    parser.add_argument("--ci-tolerance", type=float, help="relative half width of the 95%% confidence interval at which a category is done with --adaptive-repetitions", default=0.05)
+    parser.add_argument("--beam-width", type=int, help="number of best candidates reduced in parallel in every iteration", default=1)
+    parser.add_argument("--batch-jobs", type=int, help="number of batch measurement runs executed in parallel processes", default=1)
+    parser.add_argument("--jobs", type=int, help="number of candidates checked, compiled and scored in parallel", default=1)
+    parser.add_argument("--event-log-max-bytes", type=int, help="size at which the events.jsonl stream of a run is compressed and started anew", default=64 * 1024 * 1024)
+    parser.add_argument("--frontier-size", type=int, help="keep only this many best candidates and delete the files of evicted ones (default: unbounded)", default=None)
+    parser.add_argument("--lineage-bandit", action="store_true", help="split iterations between the lineages of the initial programs and new programs (with --regenerate) by how much they improve the best candidate", default=False)
+    parser.add_argument("--bandit-exploration", type=float, help="exploration constant of --lineage-bandit (UCB1)", default=1.41)
+    parser.add_argument("--no-pch", action="store_true", help="do not precompile the csmith header, parse it in every compile", default=False)
+    parser.add_argument("--prefetch-depth", type=int, help="number of csmith programs generated and sanitized in the background for --regenerate (0 disables prefetching)", default=2)
+    parser.add_argument("--profile-summary", action="store_true", help="log the time spent in every phase after each iteration (the full profile is always written to profile.json)", default=False)
+    parser.add_argument("--python-oracle", action="store_true", help="use the memoizing python interestingness test instead of the bash script", default=False)
+    parser.add_argument("--results-db", type=str, help="SQLite database the runs, iterations and candidates are recorded in, shared between runs", default=None)
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from the checkpoint in its output directory instead of starting over", default=False)
+    parser.add_argument("--scratch-dir", type=str, help="directory for temporary build files, every run uses its own subdirectory (e.g. on tmpfs: /dev/shm/srcreduce)", default=None)
+    parser.add_argument("--size-cache", type=str, help="file backing the compile-and-size cache, shared between runs", default=None)
+    parser.add_argument("--size-cache-entries", type=int, help="maximum number of entries kept in the compile-and-size cache", default=10000)
+    return parser
+
+
+# srcReduce sweep GRID [options]: runs every combination of the grid with the given options as base,
+# skipping points that finished in an earlier invocation
+def sweep_main(argv):
+    parser = argparse.ArgumentParser(description="Resumable parameter sweep of the source code reducer", parents=[build_parser(add_help=False)])
+    parser.add_argument("grid", type=str, help="JSON file mapping argument names to lists of values")
+    parser.add_argument("--cores", type=int, help="number of cores used by all concurrently running points together", default=os.cpu_count())
+    parser.add_argument("--retry-failed", action="store_true", help="run points again that failed in an earlier invocation", default=False)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        format="%(levelname)s: %(message)s",
+        level=logging.DEBUG if args.verbose else logging.INFO,
+    )
+    exit_on_sigterm()
+    choose_csmith_seed(args)
+    logging.info("Starting parameter sweep with the following arguments: %s", args)
+
+    try:
+        grid = load_grid(args.grid, args)
+    except (OSError, ValueError) as e:
+        logging.error("Cannot load sweep grid %s: %s", args.grid, e)
+        sys.exit(1)
+
+    init_size_cache(args)
+    if not run_sweep(args, grid, execute_run_spec, args.cores, retry_failed=args.retry_failed):
+        logging.error("Some sweep points failed, see the sweep manifest")
+        sys.exit(1)
+
+
+# srcReduce export-csv DB CSV: writes the results database in the format of the batch CSV
+def export_csv_main(argv):
+    parser = argparse.ArgumentParser(description="Export a results database as batch CSV")
+    parser.add_argument("results_db", type=str, help="results database written with --results-db")
+    parser.add_argument("csv", type=str, help="output CSV file")
+    parser.add_argument("--per-iteration", action="store_true", help="export the best sizes of every iteration (like the single batch mode) instead of the final sizes of every run", default=False)
+    args = parser.parse_args(argv)
+    rows = export_csv(args.results_db, args.csv, per_iteration=args.per_iteration)
+    print(f"Exported {rows} rows to {args.csv}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "sweep":
+        return sweep_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "export-csv":
+        return export_csv_main(sys.argv[2:])
 
     # Parse arguments
-    args = parser.parse_args()
+    args = build_parser().parse_args()
 
     # Set up logging
     logging.basicConfig(
         format="%(levelname)s: %(message)s",
         level=logging.DEBUG if args.verbose else logging.INFO,
     )
+    exit_on_sigterm()
+    choose_csmith_seed(args)
     logging.info("Starting framework with the following arguments: %s", args)
 
+    if not 0 <= args.seed_shard < args.seed_shards:
+        logging.error("Seed shard %d is not in the range of %d shards", args.seed_shard, args.seed_shards)
+        sys.exit(1)
+
+    if args.beam_width < 1:
+        logging.error("Beam width must be at least 1")
+        sys.exit(1)
+
+    if args.creduce_jobs is not None and args.creduce_jobs < 1:
+        logging.error("creduce jobs must be at least 1")
+        sys.exit(1)
+
     # Check if source code example file
     if args.example is not None and not os.path.exists(args.example):
         logging.error("Example file does not exist: %s", args.example)
         sys.exit(1)
 
     cleanup_or_create_output_folder(args)
+    init_size_cache(args)
 
     # Run framework normally
     if args.batch_measurements is None:
@@ -535,112 +1089,43 @@ def main():
             new_run(args)
         finally:
             logging.info("Done")
-            for item in os.listdir(os.getcwd()):
-                if item.endswith(".orig") or item.endswith(".c"):
-                    os.remove(item)
+            remove_run_scratch_dir(args)
     # Run framework in batch measurement mode
-    # In this mode, iterate through different complexities (discard passed arguments)
-    elif args.batch_measurements == 'complexity':
-        i = 0
-        output_folder_base = args.output
-        complexity_params = {'Low': (5, 2, 50), 'Medium': (10, 5, 100), 'High': (15, 8, 150)}
-        with open(args.batch_output_csv, "w") as f:
-            f.write("type,size,category\n")
-        for (complexity, level) in complexity_params.items():
-            (args.csmith_max_expr_complexity, args.csmith_max_block_depth, args.csmith_stop_by_stmt) = level
-            logging.info("Expr compl is " + str(args.csmith_max_expr_complexity))
-            bin_sizes_perc_list = PercentileList()
-            src_sizes_perc_list = PercentileList()
-            # The next line can be used to continue until all sizes within a given percentile are only up to a certain percentage away from the mean
-            # while not (i >= 10 and src_sizes_perc_list.check_percentile() and bin_sizes_perc_list.check_percentile()):
-            for _ in range(10):
-                i += 1
-                args.output = output_folder_base + str(i)
-                cleanup_or_create_output_folder(args)
-                try:
-                    src_size, bin_size = new_run(args, opt_category_param=complexity)
-                    src_sizes_perc_list.add_item(src_size)
-                    bin_sizes_perc_list.add_item(bin_size)
-                finally:
-                    logging.info("Done")
-                    for item in os.listdir(os.getcwd()):
-                        if item.endswith(".orig") or item.endswith(".c"):
-                            os.remove(item)
-                    continue
-    # In this mode, iterate through different compiler flags (discard passed arguments)
-    elif args.batch_measurements == 'optimizations':
-        i = 0
-        output_folder_base = args.output
-        optimization_params = ['O0', 'O1', 'O2', 'O3']
-        with open(args.batch_output_csv, "w") as f:
-            f.write("type,size,category\n")
-        for level in optimization_params:
-            args.compiler_flag = level
-            logging.info("Compiler flag is " + str(args.compiler_flag))
-            bin_sizes_perc_list = PercentileList()
-            src_sizes_perc_list = PercentileList()
-            # The next line can be used to continue until all sizes within a given percentile are only up to a certain percentage away from the mean
-            # while not (i >= 10 and src_sizes_perc_list.check_percentile() and bin_sizes_perc_list.check_percentile()):
-            for _ in range(10):
-                i += 1
-                args.output = output_folder_base + str(i)
-                cleanup_or_create_output_folder(args)
-                try:
-                    src_size, bin_size = new_run(args, opt_category_param=level)
-                    src_sizes_perc_list.add_item(src_size)
-                    bin_sizes_perc_list.add_item(bin_size)
-                finally:
-                    logging.info("Done")
-                    for item in os.listdir(os.getcwd()):
-                        if item.endswith(".orig") or item.endswith(".c"):
-                            os.remove(item)
-                    continue
-    # In this mode, iterate through different creduce timeouts (discard passed arguments)
-    elif args.batch_measurements == 'timeout':
-        i = 0
-        output_folder_base = args.output
-        timeout_params = {'5': (5, 25), '10': (10, 50), '15': (15, 75), '20': (20, 100), '25': (25, 125)}
-        with open(args.batch_output_csv, "w") as f:
-            f.write("type,size,category\n")
-        for (timeout_str, timeouts) in timeout_params.items():
-            (args.timeout_creduce, args.timeout_creduce_iteration) = timeouts
-            logging.info("Creduce timeout is " + str(args.timeout_creduce))
-            bin_sizes_perc_list = PercentileList()
-            src_sizes_perc_list = PercentileList()
-            # The next line can be used to continue until all sizes within a given percentile are only up to a certain percentage away from the mean
-            # while not (i >= 10 and src_sizes_perc_list.check_percentile() and bin_sizes_perc_list.check_percentile()):
-            for _ in range(10):
-                i += 1
-                args.output = output_folder_base + str(i)
-                cleanup_or_create_output_folder(args)
-                try:
-                    src_size, bin_size = new_run(args, opt_category_param=timeout_str)
-                    src_sizes_perc_list.add_item(src_size)
-                    bin_sizes_perc_list.add_item(bin_size)
-                finally:
-                    logging.info("Done")
-                    for item in os.listdir(os.getcwd()):
-                        if item.endswith(".orig") or item.endswith(".c"):
-                            os.remove(item)
-                    continue
-    elif args.batch_measurements == 'single':
-        i = 0 
-        output_folder_base = args.output
-        with open(args.batch_output_csv, "w") as f:
-            f.write("type,size,category\n")
-        for _ in range(10):
-            i += 1
-            args.output = output_folder_base + str(i)
-            cleanup_or_create_output_folder(args)
-            try:
-                new_run(args, save_iters=True)
-            finally:
-                logging.info("Done")
-                for item in os.listdir(os.getcwd()):
-                    if item.endswith(".orig") or item.endswith(".c"):
-                        os.remove(item)
-                continue
-
+    # In these modes, iterate through different complexities, compiler flags or creduce timeouts (discard passed arguments)
+    elif args.batch_measurements in BATCH_MODES:
+        write_batch_csv_header(args.batch_output_csv)
+        src_sizes_perc_lists = {category: PercentileList() for category in BATCH_MODES[args.batch_measurements]}
+        bin_sizes_perc_lists = {category: PercentileList() for category in BATCH_MODES[args.batch_measurements]}
+
+        def add_batch_result(spec, result):
+            src_size, bin_size, _ = result
+            src_sizes_perc_lists[spec.category].add_item(src_size)
+            bin_sizes_perc_lists[spec.category].add_item(bin_size)
+
+        if args.adaptive_repetitions:
+            # Continue per category until the confidence interval of the mean sizes is within the tolerance
+            run_adaptive_batch(
+                args,
+                args.batch_measurements,
+                execute_run_spec,
+                jobs=args.batch_jobs,
+                min_repetitions=args.min_repetitions,
+                tolerance=args.ci_tolerance,
+                on_result=add_batch_result,
+            )
+        else:
+            run_batch(args, expand_batch_mode(args.batch_measurements), execute_run_spec, jobs=args.batch_jobs, on_result=add_batch_result)
+        for category in BATCH_MODES[args.batch_measurements]:
+            if len(src_sizes_perc_lists[category]) > 0:
+                logging.info(
+                    "Category %s: mean source size %f, mean binary size %f",
+                    category,
+                    src_sizes_perc_lists[category].get_mean(),
+                    bin_sizes_perc_lists[category].get_mean(),
+                )
+    else:
+        logging.error("Unknown batch measurement mode: %s", args.batch_measurements)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from srcreduce.size_cache import SizeCache, hash_source
+from srcreduce.binary_size import text_size
+
+
+# Python replacement for the generated bash interestingness test. creduce calls this once per probe,
+# so it avoids spawning anything but the compiler and the candidate binary (sizes are read in-process),
+# and memoizes the measurement of every candidate text it has seen in a directory shared by all probes of a run.
+
+# Candidates smaller than this are never interesting (a file with only a single function declaration)
+MIN_SOURCE_SIZE = 500
+
+
+def write_oracle_config(config_path, args, compile_command, source_file_name, original_bin_size, iteration_dir, memo_dir) -> None:
+    config = {
+        "compile_command": compile_command,
+        "compiler": args.compiler,
+        "compiler_flag": args.compiler_flag,
+        "csmith_include": args.csmith_include,
+        "source_file_name": source_file_name,
+        "original_bin_size": original_bin_size,
+        "iteration_dir": iteration_dir,
+        "memo_dir": memo_dir,
+    }
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+
+
+def generate_oracle_script(config_path) -> str:
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return f"""#!{sys.executable}
+import sys
+sys.path.insert(0, {package_root!r})
+from srcreduce.oracle import main
+sys.exit(main({config_path!r}))
+"""
+
+
+def measure(config):
+    # Returns whether the candidate binary runs successfully and its binary size
+    devnull = subprocess.DEVNULL
+    compilation = subprocess.run(
+        config["compile_command"],
+        stdout=devnull,
+        stderr=devnull,
+    )
+    if compilation.returncode != 0:
+        return False, 0
+    if subprocess.run(["./tmp.o"], stdout=devnull, stderr=devnull).returncode != 0:
+        return False, 0
+    return True, text_size("tmp.o")
+
+
+def lookup_memo(memo_path):
+    try:
+        with open(memo_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_memo(memo_path, entry) -> None:
+    # creduce runs several probes in parallel, write atomically so readers never see partial entries
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(memo_path))
+    with os.fdopen(fd, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, memo_path)
+
+
+def main(config_path) -> int:
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    source_file_name = config["source_file_name"]
+
+    with open(source_file_name, "rb") as f:
+        source_code = f.read()
+    if len(source_code) < MIN_SOURCE_SIZE:
+        return 1
+
+    # The memo stores measurements rather than verdicts, so it stays valid when the original changes
+    cache_key = SizeCache.make_key(hash_source(source_code), config["compiler"], config["compiler_flag"], config["csmith_include"])
+    memo_path = os.path.join(config["memo_dir"], hashlib.sha256(cache_key.encode()).hexdigest() + ".json")
+    entry = lookup_memo(memo_path)
+    if entry is None:
+        runs, bin_size = measure(config)
+        entry = {"runs": runs, "bin_size": bin_size}
+        store_memo(memo_path, entry)
+
+    if not entry["runs"] or entry["bin_size"] < config["original_bin_size"]:
+        return 1
+
+    # Save the file for later under a unique name
+    fd, interesting_path = tempfile.mkstemp(prefix="interesting_", suffix=".c", dir=config["iteration_dir"])
+    os.close(fd)
+    shutil.copyfile(source_file_name, interesting_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1]))
@@ -0,0 +1,35 @@
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SourcePrefetcher:
+    # Keeps up to `depth` generated (and already sanitized) programs in flight on a thread pool, so that
+    # taking a new program usually does not wait for csmith and the sanitizer at all.
+    # Programs are handed out in the order their generation was started, independent of which finishes first,
+    # and the first seed of every program is drawn from `seeds` in that order as well.
+    def __init__(self, generate, depth, seeds):
+        assert depth > 0
+        self.generate = generate
+        self.seeds = seeds
+        self.pool = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="prefetch")
+        self.pending = deque()
+        for _ in range(depth):
+            self._submit()
+
+    def _submit(self) -> None:
+        self.pending.append(self.pool.submit(self.generate, next(self.seeds)))
+
+    def get(self):
+        future = self.pending.popleft()
+        if not future.done():
+            logging.info("Waiting for prefetched source code")
+        self._submit()
+        return future.result()
+
+    # Cancels the programs that were not started yet and waits for the ones being generated, so no csmith or
+    # sanitizer call outlives the run (and reports into the timers of the next run)
+    def close(self) -> None:
+        for future in self.pending:
+            future.cancel()
+        self.pool.shutdown(wait=True)
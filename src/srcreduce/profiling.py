@@ -0,0 +1,100 @@
+import time
+import json
+import threading
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+from srcreduce.stats import PercentileList
+
+
+# Phases of a run that are timed (see new_run), in the order they usually happen. Phases can nest, e.g.
+# "heuristic" includes the "compile" and "size" of size measurements that miss the size cache.
+PHASES = ["csmith", "sanitizer_warnings", "sanitizer_ub", "creduce", "compile", "size", "heuristic"]
+
+
+class Profiler:
+    # Wall clock timers and counters of one run, aggregated per iteration and for the whole run.
+    # Phases are timed from any thread (candidate evaluation, prefetching), so the phase totals of an
+    # iteration can add up to more than its wall clock time.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.run_start = time.time()
+        # phase -> durations of all timed calls of the run
+        self.durations = defaultdict(PercentileList)
+        self.counters = Counter()
+        self.iterations = []
+        self._start_iteration()
+
+    def _start_iteration(self) -> None:
+        self.iteration_start = time.time()
+        self.iteration_phases = defaultdict(float)
+        self.iteration_counters = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.durations[name].add_item(duration)
+                self.iteration_phases[name] += duration
+
+    def count(self, name, n=1) -> None:
+        with self.lock:
+            self.counters[name] += n
+            self.iteration_counters[name] += n
+
+    # Closes the current iteration and returns its record. Work done between iterations (e.g. generating
+    # the first program) is accounted to the following iteration.
+    def end_iteration(self, iteration) -> dict:
+        with self.lock:
+            record = {
+                "iteration": iteration,
+                "wall_time": time.time() - self.iteration_start,
+                "phases": dict(self.iteration_phases),
+                "counters": dict(self.iteration_counters),
+            }
+            self.iterations.append(record)
+            self._start_iteration()
+        return record
+
+    def report(self) -> dict:
+        with self.lock:
+            phases = {name: summarize(durations) for name, durations in self.durations.items()}
+            iteration_times = PercentileList()
+            for record in self.iterations:
+                iteration_times.add_item(record["wall_time"])
+            return {
+                "wall_time": time.time() - self.run_start,
+                "phases": phases,
+                "counters": dict(self.counters),
+                "iteration_wall_time": summarize(iteration_times),
+                "iterations": list(self.iterations),
+            }
+
+    def save(self, path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def summarize(durations) -> dict:
+    if len(durations) == 0:
+        return {"count": 0, "total": 0.0}
+    summary = {"count": len(durations), "total": sum(durations.percentile_list), "mean": durations.get_mean()}
+    lowest, highest = durations.percentile_list[0], durations.percentile_list[-1]
+    for percentile in (50, 90, 99):
+        if len(durations) < 2:
+            value = lowest
+        else:
+            # The exclusive method extrapolates beyond the data for few samples, clamp to what was observed
+            value = min(max(durations.get_quantile(percentile), lowest), highest)
+        summary[f"p{percentile}"] = value
+    summary["max"] = highest
+    return summary
+
+
+# One log line per iteration for --profile-summary
+def format_iteration(record) -> str:
+    phases = ", ".join(f"{name} {record['phases'][name]:.2f}s" for name in PHASES if name in record["phases"])
+    return f"Iteration {record['iteration']} took {record['wall_time']:.2f}s ({phases})"
@@ -0,0 +1,187 @@
+import csv
+import time
+import sqlite3
+
+
+# SQLite store of the results of runs (--results-db), shared by all runs of a batch or sweep.
+# The database is in WAL mode so concurrently running processes can write while others read, rows are
+# buffered and inserted in batches with one transaction per batch.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    output TEXT NOT NULL,
+    category TEXT,
+    compiler TEXT,
+    compiler_flag TEXT,
+    csmith_max_expr_complexity INTEGER,
+    csmith_max_block_depth INTEGER,
+    csmith_stop_by_stmt INTEGER,
+    timeout INTEGER,
+    timeout_creduce INTEGER,
+    timeout_creduce_iteration INTEGER,
+    seed INTEGER,
+    started_at REAL,
+    finished_at REAL,
+    iterations INTEGER,
+    source_size INTEGER,
+    binary_size INTEGER,
+    heuristic REAL
+);
+CREATE TABLE IF NOT EXISTS iterations (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    iteration INTEGER NOT NULL,
+    source_size INTEGER,
+    binary_size INTEGER,
+    heuristic REAL,
+    frontier_size INTEGER
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    iteration INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    source_size INTEGER,
+    binary_size INTEGER,
+    heuristic REAL,
+    rejected_by TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_category ON runs(category);
+CREATE INDEX IF NOT EXISTS runs_compiler_flag ON runs(compiler, compiler_flag);
+CREATE INDEX IF NOT EXISTS runs_complexity ON runs(csmith_max_expr_complexity);
+CREATE INDEX IF NOT EXISTS runs_timeout ON runs(timeout);
+CREATE INDEX IF NOT EXISTS iterations_run ON iterations(run_id, iteration);
+CREATE INDEX IF NOT EXISTS candidates_run ON candidates(run_id, iteration);
+"""
+
+# Run arguments stored with every run, used for grouping
+RUN_ARGUMENTS = [
+    "compiler",
+    "compiler_flag",
+    "csmith_max_expr_complexity",
+    "csmith_max_block_depth",
+    "csmith_stop_by_stmt",
+    "timeout",
+    "timeout_creduce",
+    "timeout_creduce_iteration",
+]
+
+
+def connect(path) -> sqlite3.Connection:
+    # Runs of a batch write at the same time, wait for the lock instead of failing
+    connection = sqlite3.connect(path, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class ResultsStore:
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = connect(path)
+        self.pending_iterations = []
+        self.pending_candidates = []
+
+    def start_run(self, args, category, seed) -> int:
+        values = [getattr(args, name, None) for name in RUN_ARGUMENTS]
+        with self.connection:
+            cursor = self.connection.execute(
+                f"INSERT INTO runs (output, category, {', '.join(RUN_ARGUMENTS)}, seed, started_at) "
+                f"VALUES (?, ?, {', '.join('?' for _ in RUN_ARGUMENTS)}, ?, ?)",
+                [args.output, category, *values, seed, time.time()],
+            )
+        return cursor.lastrowid
+
+    # Removes what an interrupted run recorded after its last checkpoint, those iterations are run again
+    def resume_run(self, run_id, iteration) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM iterations WHERE run_id = ? AND iteration > ?", (run_id, iteration))
+            self.connection.execute("DELETE FROM candidates WHERE run_id = ? AND iteration > ?", (run_id, iteration))
+
+    def add_candidate(self, run_id, iteration, path, source_size, binary_size, heuristic, rejected_by) -> None:
+        self.pending_candidates.append((run_id, iteration, path, source_size, binary_size, heuristic, rejected_by))
+        if len(self.pending_candidates) >= self.batch_size:
+            self.flush()
+
+    def add_iteration(self, run_id, iteration, source_size, binary_size, heuristic, frontier_size) -> None:
+        self.pending_iterations.append((run_id, iteration, source_size, binary_size, heuristic, frontier_size))
+        if len(self.pending_iterations) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending_iterations and not self.pending_candidates:
+            return
+        with self.connection:
+            self.connection.executemany("INSERT INTO iterations VALUES (?, ?, ?, ?, ?, ?)", self.pending_iterations)
+            self.connection.executemany("INSERT INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?)", self.pending_candidates)
+        self.pending_iterations = []
+        self.pending_candidates = []
+
+    def finish_run(self, run_id, iterations, source_size, binary_size, heuristic) -> None:
+        self.flush()
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET finished_at = ?, iterations = ?, source_size = ?, binary_size = ?, heuristic = ? WHERE id = ?",
+                (time.time(), iterations, source_size, binary_size, heuristic, run_id),
+            )
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
+
+
+# Writes the finished runs (or with per_iteration, the best sizes of every iteration) in the format of the
+# batch CSV (type,size,category), so the CSV based plots keep working
+def export_csv(db_path, csv_path, per_iteration=False) -> int:
+    connection = connect(db_path)
+    if per_iteration:
+        query = "SELECT source_size, binary_size, iteration FROM iterations ORDER BY run_id, iteration"
+    else:
+        query = "SELECT source_size, binary_size, category FROM runs WHERE finished_at IS NOT NULL ORDER BY id"
+    rows = 0
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["type", "size", "category"])
+        for source_size, binary_size, category in connection.execute(query):
+            if source_size is None:
+                continue
+            writer.writerow(["Source", source_size, category])
+            writer.writerow(["Binary", binary_size, category])
+            rows += 1
+    connection.close()
+    return rows
+
+
+# The finished runs and their iterations as columns in the layout of plotting/log_ingest.py, so the log
+# based plots can be created from a results database as well
+def load_plot_columns(db_path) -> dict:
+    connection = connect(db_path)
+    runs = {name: [] for name in ["id_no", *RUN_ARGUMENTS, "best_heuristic", "best_code_size", "best_binary_size"]}
+    sizes = {"run": [], "iteration": [], "source_size": [], "binary_size": []}
+    heuristics = {"run": [], "iteration": [], "heuristic": []}
+    run_rows = {}
+    query = f"SELECT id, {', '.join(RUN_ARGUMENTS)}, heuristic, source_size, binary_size FROM runs WHERE finished_at IS NOT NULL ORDER BY id"
+    for run_id, *arguments, heuristic, source_size, binary_size in connection.execute(query):
+        run_rows[run_id] = len(runs["id_no"])
+        runs["id_no"].append(str(run_id))
+        # Arguments are compared as they appear in the log
+        for name, value in zip(RUN_ARGUMENTS, arguments):
+            runs[name].append("" if value is None else str(value))
+        runs["best_heuristic"].append(heuristic)
+        runs["best_code_size"].append(source_size)
+        runs["best_binary_size"].append(binary_size)
+    query = "SELECT run_id, iteration, source_size, binary_size, heuristic FROM iterations WHERE source_size IS NOT NULL ORDER BY run_id, iteration"
+    for run_id, iteration, source_size, binary_size, heuristic in connection.execute(query):
+        if run_id not in run_rows:
+            continue
+        sizes["run"].append(run_rows[run_id])
+        sizes["iteration"].append(iteration)
+        sizes["source_size"].append(source_size)
+        sizes["binary_size"].append(binary_size)
+        if heuristic is not None:
+            heuristics["run"].append(run_rows[run_id])
+            heuristics["iteration"].append(iteration)
+            heuristics["heuristic"].append(heuristic)
+    connection.close()
+    return {"runs": runs, "sizes": sizes, "heuristics": heuristics}
@@ -0,0 +1,33 @@
+import random
+import logging
+import threading
+
+
+def random_base_seed() -> int:
+    return random.SystemRandom().randrange(2**31)
+
+
+class SeedStream:
+    # Stream of csmith seeds for one shard. Shard i of n draws base + i, base + i + n, base + i + 2n, ...
+    # so shards (machines, batch runs) never generate the same program. Seeds are handed out in a fixed
+    # order, so a run that draws them sequentially is reproducible from (base, shard, shards), and any
+    # single program can be replayed from its logged seed with --csmith-seed SEED --seed-shards 1.
+    def __init__(self, base=None, shard=0, shards=1):
+        assert shards > 0 and 0 <= shard < shards
+        if base is None:
+            base = random_base_seed()
+            logging.info("No csmith seed given, using base seed %d", base)
+        self.base = base
+        self.shard = shard
+        self.shards = shards
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        with self.lock:
+            seed = self.base + self.shard + self.position * self.shards
+            self.position += 1
+        return seed
@@ -0,0 +1,117 @@
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+# Bump whenever the meaning of a cached value changes so old backing files are ignored
+CACHE_FORMAT_VERSION = 1
+
+
+def hash_source(source_code) -> str:
+    if isinstance(source_code, str):
+        source_code = source_code.encode()
+    return hashlib.sha256(source_code).hexdigest()
+
+
+def hash_file(path) -> str:
+    with open(path, "rb") as f:
+        return hash_source(f.read())
+
+
+class SizeCache:
+    # Content-addressed LRU cache of (source size, binary size) measurements.
+    # Entries are keyed by (source hash, compiler, compiler flag, include path), so renaming or
+    # copying a file (e.g. init_N.c in every iteration directory) never triggers a recompile.
+    def __init__(self, max_entries=10000, backing_file=None):
+        assert max_entries > 0
+        self.max_entries = max_entries
+        self.backing_file = backing_file
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if backing_file is not None:
+            self.load()
+
+    @staticmethod
+    def make_key(source_hash, compiler, compiler_flag, include_path) -> str:
+        # Stored as a string so the key survives the round trip through JSON
+        return "\0".join([source_hash, compiler, compiler_flag, include_path])
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self.lock:
+            self._insert(key, tuple(value))
+
+    def _insert(self, key, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self) -> None:
+        if self.backing_file is None or not os.path.exists(self.backing_file):
+            return
+        try:
+            with open(self.backing_file, "r") as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable size cache %s: %s", self.backing_file, e)
+            return
+        if data.get("version") != CACHE_FORMAT_VERSION:
+            logging.info("Ignoring size cache %s with outdated format", self.backing_file)
+            return
+        with self.lock:
+            # Entries are stored least recently used first
+            for key, value in data["entries"]:
+                self._insert(key, tuple(value))
+        logging.info("Loaded %d entries from size cache %s", len(self.entries), self.backing_file)
+
+    def save(self) -> None:
+        if self.backing_file is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.backing_file))
+        os.makedirs(directory, exist_ok=True)
+        # Several runs may share one backing file, so merge with what is on disk under an exclusive
+        # lock and then atomically replace the file.
+        with open(self.backing_file + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            merged = OrderedDict()
+            if os.path.exists(self.backing_file):
+                try:
+                    with open(self.backing_file, "r") as f:
+                        data = json.load(f)
+                    if data.get("version") == CACHE_FORMAT_VERSION:
+                        for key, value in data["entries"]:
+                            merged[key] = tuple(value)
+                except (OSError, ValueError) as e:
+                    logging.warning("Overwriting unreadable size cache %s: %s", self.backing_file, e)
+            with self.lock:
+                for key, value in self.entries.items():
+                    merged.pop(key, None)
+                    merged[key] = value
+            while len(merged) > self.max_entries:
+                merged.popitem(last=False)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".size_cache_")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": CACHE_FORMAT_VERSION, "entries": list(merged.items())}, f)
+            os.replace(tmp_path, self.backing_file)
+        logging.info("Saved %d entries to size cache %s (hits: %d, misses: %d)", len(merged), self.backing_file, self.hits, self.misses)
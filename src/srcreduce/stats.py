@@ -0,0 +1,80 @@
+import math
+from bisect import insort
+from statistics import StatisticsError
+
+
+# Two-sided 95% critical values of Student's t distribution by degrees of freedom, normal beyond
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+class PercentileList:
+    # Keeps the items sorted by inserting them in place and tracks mean and variance incrementally
+    # (Welford), so adding an item never re-sorts and checks only compute the quantiles they need.
+    def __init__(self):
+        self.percentile_list = []
+        self.count = 0
+        self.running_mean = 0.0
+        self.sum_of_squares = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def add_item(self, item):
+        insort(self.percentile_list, item)
+        self.count += 1
+        delta = item - self.running_mean
+        self.running_mean += delta / self.count
+        self.sum_of_squares += delta * (item - self.running_mean)
+
+    def get_mean(self):
+        if self.count == 0:
+            raise StatisticsError("mean requires at least one data point")
+        return self.running_mean
+
+    def get_variance(self):
+        if self.count < 2:
+            raise StatisticsError("variance requires at least two data points")
+        return self.sum_of_squares / (self.count - 1)
+
+    # Cut point i of n intervals, same as statistics.quantiles(data, n=n)[i - 1] (exclusive method)
+    def get_quantile(self, i, n=100):
+        data = self.percentile_list
+        ld = len(data)
+        if ld < 2:
+            raise StatisticsError("must have at least two data points")
+        m = ld + 1
+        j = i * m // n
+        j = 1 if j < 1 else ld - 1 if j > ld - 1 else j
+        delta = i * m - j * n
+        return (data[j - 1] * (n - delta) + data[j] * delta) / n
+
+    # Return percentiles at beginning and end of list (default: 1st and 99th percentile)
+    def get_percentile(self, percentile=99):
+        assert 0 < percentile < 100
+        return (self.get_quantile(101 - percentile), self.get_quantile(percentile))
+
+    # Checks whether the percentiles are within dist_of_mean percent of the mean
+    def check_percentile(self, percentile=99, dist_from_mean=0.05):
+        assert 0 < dist_from_mean < 0.5
+        current_mean = self.get_mean()
+        lower_bound = current_mean - dist_from_mean*current_mean
+        upper_bound = current_mean + dist_from_mean*current_mean
+        lower_quant, upper_quant = self.get_percentile(percentile)
+        return lower_bound <= lower_quant and upper_quant <= upper_bound
+
+    # Half width of the 95% confidence interval of the mean, relative to the mean (inf if unknown)
+    def get_relative_confidence_interval(self):
+        if self.count < 2 or self.running_mean == 0:
+            return math.inf
+        degrees_of_freedom = self.count - 1
+        t = T_CRITICAL_95[degrees_of_freedom - 1] if degrees_of_freedom <= len(T_CRITICAL_95) else 1.96
+        return t * math.sqrt(self.get_variance() / self.count) / abs(self.running_mean)
+
+    # Checks whether the confidence interval of the mean is within dist_from_mean percent of the mean
+    def check_confidence_interval(self, dist_from_mean=0.05):
+        assert 0 < dist_from_mean < 0.5
+        return self.get_relative_confidence_interval() <= dist_from_mean
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from srcreduce.batch import RunSpec
+
+
+# Resumable parameter sweeps (`srcReduce sweep GRID ...`). A grid is a JSON object mapping argument names
+# (e.g. "timeout_creduce" or "--timeout-creduce") to lists of values, every combination is one point.
+# Finished points are recorded in a manifest next to the outputs, so an interrupted sweep continues
+# where it stopped when started again with the same grid and output.
+
+MANIFEST_FILE_NAME = "sweep_manifest.jsonl"
+
+
+def load_grid(path, args) -> dict:
+    with open(path, "r") as f:
+        raw_grid = json.load(f)
+    grid = {}
+    for name, values in raw_grid.items():
+        name = name.lstrip("-").replace("-", "_")
+        if not hasattr(args, name):
+            raise ValueError(f"Unknown argument in sweep grid: {name}")
+        if not isinstance(values, list) or len(values) == 0:
+            raise ValueError(f"Sweep grid values of {name} must be a non-empty list")
+        grid[name] = values
+    return grid
+
+
+def expand_grid(grid) -> list:
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# Identifies a point independently of its position in the grid, so that extending the grid keeps finished points
+def point_id(params) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class SweepManifest:
+    # Append-only JSONL log of the points, the last record of a point wins. A point is recorded as pending
+    # with its index before it runs for the first time and as done or failed once it finished.
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    self.records[record["point"]] = record
+
+    def status(self, point) -> str:
+        record = self.records.get(point)
+        return None if record is None else record["status"]
+
+    # Index of every point ever recorded, a point keeps its index (and thereby its output directory and
+    # seed shard) no matter where it is in the grid
+    def indices(self) -> dict:
+        return {point: record["index"] for point, record in self.records.items()}
+
+    def record(self, record) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[record["point"]] = record
+
+
+# Effective value of argument `name` for a point
+def point_argument(args, overrides, name):
+    return overrides.get(name, getattr(args, name))
+
+
+# Cores a point uses: its beam_width creduce runs of creduce_jobs processes each, and then the evaluation of
+# jobs candidates at a time
+def point_cores(args, overrides) -> int:
+    creduce_jobs = point_argument(args, overrides, "creduce_jobs")
+    return max(point_argument(args, overrides, "jobs"), creduce_jobs * point_argument(args, overrides, "beam_width"))
+
+
+# Runs all points that are not finished yet with `execute(args, spec)` (see execute_run_spec). A point is
+# started as soon as its cores (see point_cores, from its own arguments) fit into what is left of the core
+# budget, in grid order but letting smaller points go ahead of one that does not fit yet. A point that needs
+# more than the whole budget runs alone.
+# Returns whether all points of the grid are finished successfully.
+def run_sweep(args, grid, execute, cores, retry_failed=False) -> bool:
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    manifest = SweepManifest(args.output + "_" + MANIFEST_FILE_NAME)
+
+    points = expand_grid(grid)
+    indices = manifest.indices()
+    next_index = max(indices.values(), default=0) + 1
+    pending = []
+    # index -> grid parameters of the pending points, as recorded in the manifest
+    params_by_index = {}
+    for params in points:
+        point = point_id(params)
+        if point not in indices:
+            # New points are numbered after all points seen before, never reusing the output of another point
+            indices[point] = next_index
+            next_index += 1
+            manifest.record({"point": point, "index": indices[point], "params": params, "output": args.output + str(indices[point]), "status": "pending"})
+        status = manifest.status(point)
+        if status == "done" or (status == "failed" and not retry_failed):
+            continue
+        overrides = dict(params)
+        if point_argument(args, overrides, "creduce_jobs") is None:
+            # By default creduce would use all cores of the machine, make that explicit
+            overrides["creduce_jobs"] = max(1, (os.cpu_count() or 1) // point_argument(args, overrides, "beam_width"))
+        params_by_index[indices[point]] = params
+        pending.append(RunSpec(indices[point], point, overrides, False))
+    logging.info("Sweep over %d points, %d already finished, %d to run", len(points), len(points) - len(pending), len(pending))
+
+    free_cores = cores
+    running = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(len(pending), cores))) as pool:
+        while pending or running:
+            for spec in list(pending):
+                needed = point_cores(args, spec.overrides)
+                if needed <= free_cores or not running:
+                    pending.remove(spec)
+                    free_cores -= needed
+                    running[pool.submit(execute, args, spec)] = spec
+                    logging.info("Starting sweep point %d (%s) with %d cores, %d cores left", spec.index, spec.category, needed, max(0, free_cores))
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                spec = running.pop(future)
+                free_cores += point_cores(args, spec.overrides)
+                result = future.result()
+                record = {"point": spec.category, "index": spec.index, "params": params_by_index[spec.index], "output": args.output + str(spec.index)}
+                if result is None:
+                    record["status"] = "failed"
+                else:
+                    record["status"] = "done"
+                    record["source_size"], record["binary_size"] = result[0], result[1]
+                record["finished_at"] = time.time()
+                manifest.record(record)
+                logging.info("Sweep point %d (%s) %s", spec.index, spec.category, record["status"])
+    return all(manifest.status(point_id(params)) == "done" for params in points)